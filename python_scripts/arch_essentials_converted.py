@@ -9,23 +9,41 @@ from __future__ import annotations
 
 import argparse
 import datetime as dt
+import functools
 import json
 import os
 import pwd
 import re
 import shutil
 import subprocess
-import tempfile
+import sys
 from pathlib import Path
-from typing import Iterable
+from typing import Any, Callable, Iterable, Iterator
+
+_RE_INET = re.compile(r"\binet (\S+?)/")
+_RE_PKG_NAME_VERSION = re.compile(r"^Name\s*:\s*(\S+).*?^Version\s*:\s*(\S+)", re.MULTILINE | re.DOTALL)
+_RE_PING_LATENCY = re.compile(r"=\s*[\d.]+/([\d.]+)/")
+_RE_PING_LOSS = re.compile(r"([\d.]+)%\s+packet loss")
+_RE_DESKTOP_NAME = re.compile(r"^Name=(.*)$", re.MULTILINE)
+_RE_GRUB_THEME = re.compile(r"^GRUB_THEME=.*$", re.MULTILINE)
+
+_AUTOSTART_KEY = "X-GNOME-Autostart-enabled"
+_AUTOSTART_TRUE = f"{_AUTOSTART_KEY}=true"
+_AUTOSTART_FALSE = f"{_AUTOSTART_KEY}=false"
+_RE_DESKTOP_ENABLED = re.compile(rf"^{_AUTOSTART_KEY}=(.*)$", re.MULTILINE)
+_AUTOSTART_RE = re.compile(rf"{_AUTOSTART_KEY}=(true|false)")
+_PACMAN_QK_CLEAN = ", 0 missing files"
+
+_EUID = os.geteuid()
 
 
 def now() -> str:
     return dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
+@functools.lru_cache(maxsize=1)
 def get_target_home() -> Path:
-    if os.geteuid() == 0 and os.environ.get("SUDO_USER"):
+    if _EUID == 0 and os.environ.get("SUDO_USER"):
         try:
             return Path(pwd.getpwnam(os.environ["SUDO_USER"]).pw_dir)
         except Exception:
@@ -33,29 +51,50 @@ def get_target_home() -> Path:
     return Path.home()
 
 
+@functools.lru_cache(maxsize=256)
+def _which(name: str, path_env: str) -> str | None:
+    return shutil.which(name, path=path_env)
+
+
 def command_exists(name: str) -> bool:
-    return shutil.which(name) is not None
+    return _which(name, os.environ.get("PATH", os.defpath)) is not None
 
 
 def with_sudo(cmd: list[str], sudo: bool) -> list[str]:
-    if sudo and os.geteuid() != 0:
+    if sudo and _EUID != 0:
         return ["sudo", *cmd]
     return cmd
 
 
+_FAST_PATHS: dict[tuple[str, ...], Callable[[], str]] = {
+    ("hostname",): lambda: os.uname().nodename,
+    ("uname", "-r"): lambda: os.uname().release,
+    ("uname", "-n"): lambda: os.uname().nodename,
+    ("uname", "-m"): lambda: os.uname().machine,
+}
+
+
 def run_cmd(
     cmd: list[str],
     *,
     sudo: bool = False,
     check: bool = False,
     capture: bool = True,
+    input: str | None = None,
 ) -> subprocess.CompletedProcess[str]:
+    fast = None if sudo or input is not None else _FAST_PATHS.get(tuple(cmd))
+    if fast is not None:
+        out = fast() + "\n"
+        if not capture:
+            print(out, end="")
+        return subprocess.CompletedProcess(cmd, 0, out if capture else None, "" if capture else None)
     try:
         return subprocess.run(
             with_sudo(cmd, sudo),
             check=check,
             text=True,
             capture_output=capture,
+            input=input,
         )
     except FileNotFoundError:
         return subprocess.CompletedProcess(cmd, 127, "", f"command not found: {cmd[0]}")
@@ -63,8 +102,30 @@ def run_cmd(
         return subprocess.CompletedProcess(cmd, 1, "", str(exc))
 
 
+async def _run_async(cmd: list[str]) -> subprocess.CompletedProcess[str]:
+    import asyncio
+
+    try:
+        proc = await asyncio.create_subprocess_exec(*cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        return subprocess.CompletedProcess(cmd, 127, "", f"command not found: {cmd[0]}")
+    except Exception as exc:  # pylint: disable=broad-except
+        return subprocess.CompletedProcess(cmd, 1, "", str(exc))
+    out, err = await proc.communicate()
+    return subprocess.CompletedProcess(cmd, proc.returncode or 0, out.decode(errors="replace"), err.decode(errors="replace"))
+
+
+def run_many(cmds: list[list[str]]) -> list[subprocess.CompletedProcess[str]]:
+    import asyncio
+
+    async def gather() -> list[subprocess.CompletedProcess[str]]:
+        return list(await asyncio.gather(*(_run_async(c) for c in cmds)))
+
+    return asyncio.run(gather())
+
+
 def run_shell(command: str, *, sudo: bool = False, check: bool = False) -> subprocess.CompletedProcess[str]:
-    if sudo and os.geteuid() != 0:
+    if sudo and _EUID != 0:
         command = "sudo " + command
     try:
         return subprocess.run(command, shell=True, check=check, text=True, capture_output=True)
@@ -72,6 +133,20 @@ def run_shell(command: str, *, sudo: bool = False, check: bool = False) -> subpr
         return subprocess.CompletedProcess(command, 1, "", str(exc))
 
 
+def _stream_lines(cmd: list[str], *, stderr: int) -> Iterator[str]:
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, text=True, bufsize=1)
+    except OSError:
+        return
+    with proc:
+        try:
+            for line in proc.stdout or ():
+                yield line.rstrip("\n")
+        finally:
+            if proc.poll() is None:
+                proc.terminate()
+
+
 def ask_yes_no(question: str, *, default_yes: bool = True, assume_yes: bool = False) -> bool:
     if assume_yes:
         return True
@@ -87,6 +162,12 @@ def write_report(path: Path, lines: Iterable[str]) -> None:
     path.write_text("\n".join(lines) + "\n", encoding="utf-8")
 
 
+def _write_lines(items: Iterable[str]) -> None:
+    out = sys.stdout
+    out.writelines(f"{x}\n" for x in items)
+    out.flush()
+
+
 def print_cmd(cp: subprocess.CompletedProcess[str]) -> None:
     if cp.stdout:
         print(cp.stdout.strip())
@@ -94,12 +175,135 @@ def print_cmd(cp: subprocess.CompletedProcess[str]) -> None:
         print(cp.stderr.strip())
 
 
+_DIR_SIZE_CACHE: dict[str, tuple[int, int]] = {}
+
+
+def _human(n: int) -> str:
+    if n < 1024:
+        return f"{n}B"
+    size = n / 1024
+    for unit in ("KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GiB"
+
+
+def _walk_size(path: str) -> int:
+    total = 0
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    total += st.st_blocks * 512
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+        except OSError:
+            continue
+    return total
+
+
 def dir_size_human(path: str) -> str:
-    cp = run_cmd(["du", "-sh", path])
-    if cp.returncode != 0:
+    key = os.path.abspath(path)
+    try:
+        st = os.stat(key)
+    except OSError:
         return "N/A"
-    parts = (cp.stdout or "").strip().split()
-    return parts[0] if parts else "N/A"
+    cached = _DIR_SIZE_CACHE.get(key)
+    if cached and cached[0] == st.st_mtime_ns:
+        return _human(cached[1])
+    size = st.st_blocks * 512 + _walk_size(key)
+    _DIR_SIZE_CACHE[key] = (st.st_mtime_ns, size)
+    return _human(size)
+
+
+def _stdout(cmd: list[str]) -> str:
+    return (run_cmd(cmd).stdout or "").strip()
+
+
+def _tail(s: str, n: int) -> str:
+    return "\n".join(s.splitlines()[-n:]) if n > 0 else ""
+
+
+def _head(s: str, n: int) -> str:
+    return "\n".join(s.splitlines()[:n])
+
+
+def _grep(s: str, *needles: str, ignore_case: bool = False) -> str:
+    if ignore_case:
+        needles = tuple(n.lower() for n in needles)
+        return "\n".join(line for line in s.splitlines() if any(n in line.lower() for n in needles))
+    return "\n".join(line for line in s.splitlines() if any(n in line for n in needles))
+
+
+def _first_field(s: str) -> str:
+    parts = s.split()
+    return parts[0] if parts else ""
+
+
+def _purge_dir(path: Path) -> int:
+    errors = 0
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError as exc:
+        print(f"Failed to read {path}: {exc}")
+        return 1
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.unlink(entry.path)
+        except FileNotFoundError:
+            continue
+        except OSError as exc:
+            print(f"Failed to remove {entry.path}: {exc}")
+            errors += 1
+    return errors
+
+
+def _write_root_file(path: Path, text: str) -> subprocess.CompletedProcess[str]:
+    import tempfile
+
+    if _EUID != 0:
+        try:
+            return subprocess.run(["sudo", "tee", str(path)], input=text, text=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except OSError as exc:
+            return subprocess.CompletedProcess(["sudo", "tee", str(path)], 1, "", str(exc))
+    tmp_name = ""
+    try:
+        mode = path.stat().st_mode & 0o7777 if path.exists() else 0o644
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent, delete=False) as tmp:
+            tmp_name = tmp.name
+            tmp.write(text)
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, path)
+    except OSError as exc:
+        if tmp_name:
+            Path(tmp_name).unlink(missing_ok=True)
+        return subprocess.CompletedProcess(["write", str(path)], 1, "", str(exc))
+    return subprocess.CompletedProcess(["write", str(path)], 0, "", "")
+
+
+@functools.lru_cache(maxsize=1)
+def _os_release() -> dict[str, str]:
+    d: dict[str, str] = {}
+    try:
+        txt = Path("/etc/os-release").read_text(encoding="utf-8", errors="ignore")
+    except OSError:
+        return d
+    for line in txt.splitlines():
+        if "=" in line and not line.startswith("#"):
+            k, v = line.split("=", 1)
+            d[k.strip()] = v.strip().strip('"').strip("'")
+    return d
 
 
 def _require_cmd(name: str) -> int:
@@ -119,8 +323,8 @@ def check_logs(args: argparse.Namespace) -> int:
     lines.append((j.stdout or "").strip())
     lines.append("")
     lines.append("=== dmesg tail ===")
-    d = run_shell(f"dmesg | tail -n {int(args.lines)}")
-    lines.append((d.stdout or "").strip())
+    d = run_cmd(["dmesg"])
+    lines.append(_tail((d.stdout or "").strip(), int(args.lines)))
     write_report(report, lines)
     print(f"Report saved: {report}")
     return 0
@@ -143,6 +347,7 @@ def clear_pacman_cache(args: argparse.Namespace) -> int:
         return 0
     cp = run_cmd(["paccache", "-r", "-k", str(args.keep)], sudo=True)
     print_cmd(cp)
+    _DIR_SIZE_CACHE.pop("/var/cache/pacman/pkg", None)
     print(f"Pacman cache after: {dir_size_human('/var/cache/pacman/pkg')}")
     return cp.returncode
 
@@ -166,13 +371,20 @@ def clear_temp_files(args: argparse.Namespace) -> int:
     print(f"/var/tmp before: {dir_size_human('/var/tmp')}")
     if not ask_yes_no("Clear /tmp and /var/tmp contents?", assume_yes=args.yes):
         return 0
-    c1 = run_shell("find /tmp -mindepth 1 -maxdepth 1 -exec rm -rf {} +", sudo=True)
-    c2 = run_shell("find /var/tmp -mindepth 1 -maxdepth 1 -exec rm -rf {} +", sudo=True)
-    print_cmd(c1)
-    print_cmd(c2)
+    if _EUID == 0:
+        ok = _purge_dir(Path("/tmp")) == 0
+        ok = _purge_dir(Path("/var/tmp")) == 0 and ok
+    else:
+        c1 = run_shell("find /tmp -mindepth 1 -maxdepth 1 -exec rm -rf {} +", sudo=True)
+        c2 = run_shell("find /var/tmp -mindepth 1 -maxdepth 1 -exec rm -rf {} +", sudo=True)
+        print_cmd(c1)
+        print_cmd(c2)
+        ok = c1.returncode == 0 and c2.returncode == 0
+    _DIR_SIZE_CACHE.pop("/tmp", None)
+    _DIR_SIZE_CACHE.pop("/var/tmp", None)
     print(f"/tmp after: {dir_size_human('/tmp')}")
     print(f"/var/tmp after: {dir_size_human('/var/tmp')}")
-    return 0 if c1.returncode == 0 and c2.returncode == 0 else 1
+    return 0 if ok else 1
 
 
 def list_orphaned_packages(_: argparse.Namespace) -> int:
@@ -184,7 +396,7 @@ def list_orphaned_packages(_: argparse.Namespace) -> int:
         print("No orphaned packages found.")
         return 0
     print(f"Orphaned packages: {len(pkgs)}")
-    print("\n".join(sorted(pkgs)))
+    _write_lines(sorted(pkgs))
     return 0
 
 
@@ -205,12 +417,17 @@ def remove_orphaned_packages(args: argparse.Namespace) -> int:
     return rm.returncode
 
 
+def _pacman_qk_problems() -> Iterator[str]:
+    # pacman reports missing files on stderr, so both streams are searched.
+    lines = _stream_lines(["pacman", "-Qk"], stderr=subprocess.STDOUT)
+    return (line for line in lines if line.strip() and _PACMAN_QK_CLEAN not in line)
+
+
 def find_broken_packages(args: argparse.Namespace) -> int:
     if _require_cmd("pacman"):
         return 1
     report = Path(args.report or (get_target_home() / "broken_packages_report.txt"))
-    qk = run_shell("pacman -Qk 2>&1")
-    broken = sorted({line.split()[0] for line in (qk.stdout or "").splitlines() if line.strip() and "0 missing files" not in line})
+    broken = sorted({line.split(None, 1)[0] for line in _pacman_qk_problems()})
     lines = [f"Timestamp: {now()}"]
     if not broken:
         print("No broken packages found.")
@@ -218,7 +435,7 @@ def find_broken_packages(args: argparse.Namespace) -> int:
         write_report(report, lines)
         return 0
     print("Broken packages:")
-    print("\n".join(broken))
+    _write_lines(broken)
     lines.extend(broken)
     if args.reinstall and ask_yes_no("Reinstall broken packages?", assume_yes=args.yes):
         cp = run_cmd(["pacman", "-S", "--needed", *broken], sudo=True)
@@ -229,48 +446,67 @@ def find_broken_packages(args: argparse.Namespace) -> int:
     return 0
 
 
+@functools.lru_cache(maxsize=1)
+def _pacman_inventory() -> tuple[dict[str, str], frozenset[str]]:
+    total: dict[str, str] = {}
+    for line in (run_cmd(["pacman", "-Q"]).stdout or "").splitlines():
+        if line.strip():
+            total[line.split(" ", 1)[0]] = line.strip()
+    foreign = frozenset(
+        line.split(" ", 1)[0] for line in (run_cmd(["pacman", "-Qm"]).stdout or "").splitlines() if line.strip()
+    )
+    return total, foreign
+
+
 def list_installed_packages(args: argparse.Namespace) -> int:
     if _require_cmd("pacman"):
         return 1
-    official = run_cmd(["pacman", "-Qn"]).stdout.splitlines()
-    aur = run_cmd(["pacman", "-Qm"]).stdout.splitlines()
-    orphan = run_cmd(["pacman", "-Qdtq"]).stdout.splitlines()
-    total = run_cmd(["pacman", "-Q"]).stdout.splitlines()
+    total, foreign = _pacman_inventory()
+    official = set(total) - foreign
+    orphan = [x for x in (run_cmd(["pacman", "-Qdtq"]).stdout or "").splitlines() if x.strip()]
 
-    print(f"Official packages: {len([x for x in official if x.strip()])}")
-    print(f"AUR/foreign packages: {len([x for x in aur if x.strip()])}")
-    print(f"Orphaned packages: {len([x for x in orphan if x.strip()])}")
-    print(f"Total installed packages: {len([x for x in total if x.strip()])}")
+    print(f"Official packages: {len(official)}")
+    print(f"AUR/foreign packages: {len(foreign)}")
+    print(f"Orphaned packages: {len(orphan)}")
+    print(f"Total installed packages: {len(total)}")
 
     if args.verbose:
         print("\nOfficial:")
-        print("\n".join(sorted([x for x in official if x.strip()])))
+        _write_lines(sorted(total[x] for x in official))
         print("\nAUR:")
-        print("\n".join(sorted([x for x in aur if x.strip()])))
+        _write_lines(sorted(total[x] for x in foreign if x in total))
     return 0
 
 
 def list_system_packages(_: argparse.Namespace) -> int:
     if _require_cmd("pacman"):
         return 1
-    cp = run_cmd(["pacman", "-Qnq"])
-    pkgs = sorted([x.strip() for x in (cp.stdout or "").splitlines() if x.strip()])
+    total, foreign = _pacman_inventory()
+    pkgs = sorted(set(total) - foreign)
     print(f"System package count: {len(pkgs)}")
-    print("\n".join(pkgs))
+    _write_lines(pkgs)
     return 0
 
 
+_AUR_HELPERS = ("yay", "paru", "pikaur")
+
+
+@functools.lru_cache(maxsize=1)
+def _find_aur_helper() -> str | None:
+    return next((h for h in _AUR_HELPERS if command_exists(h)), None)
+
+
 def list_aur_packages(args: argparse.Namespace) -> int:
     if _require_cmd("pacman"):
         return 1
     cp = run_cmd(["pacman", "-Qm"])
     pkgs = sorted([x.strip() for x in (cp.stdout or "").splitlines() if x.strip()])
     print(f"AUR/foreign package count: {len(pkgs)}")
-    print("\n".join(pkgs))
+    _write_lines(pkgs)
     if args.remove:
-        helper = "yay" if command_exists("yay") else "paru" if command_exists("paru") else None
+        helper = _find_aur_helper()
         if not helper:
-            print("No AUR helper (yay/paru) found.")
+            print("No AUR helper found (yay/paru/pikaur).")
             return 1
         rm = run_cmd([helper, "-Rns", args.remove, "--noconfirm"], sudo=True)
         print_cmd(rm)
@@ -299,7 +535,7 @@ def install_package(args: argparse.Namespace) -> int:
         print_cmd(cp)
         return cp.returncode
 
-    helper = "yay" if command_exists("yay") else "paru" if command_exists("paru") else "pikaur" if command_exists("pikaur") else None
+    helper = _find_aur_helper()
     if not helper:
         print("No AUR helper found (yay/paru/pikaur).")
         return 1
@@ -308,7 +544,27 @@ def install_package(args: argparse.Namespace) -> int:
     return cp.returncode
 
 
+_KEYRING_INITIALIZED = False
+_KEYRING_PUBRING = "/etc/pacman.d/gnupg/pubring.gpg"
+_KEYRING_FRESH_SECONDS = 3600
+
+
+def _ensure_keyring() -> None:
+    global _KEYRING_INITIALIZED
+    if _KEYRING_INITIALIZED:
+        return
+    try:
+        fresh = dt.datetime.now().timestamp() - os.path.getmtime(_KEYRING_PUBRING) < _KEYRING_FRESH_SECONDS
+    except OSError:
+        fresh = False
+    if not fresh:
+        run_cmd(["pacman-key", "--init"], sudo=True)
+        run_cmd(["pacman-key", "--populate"], sudo=True)
+    _KEYRING_INITIALIZED = True
+
+
 def system_update(_: argparse.Namespace) -> int:
+    global _KEYRING_INITIALIZED
     if _require_cmd("pacman"):
         return 1
     log = get_target_home() / ".arch_tools_logs" / "system_update.log"
@@ -326,6 +582,8 @@ def system_update(_: argparse.Namespace) -> int:
         lines.extend((cp.stderr or "").splitlines())
         if cp.returncode != 0:
             break
+    else:
+        _KEYRING_INITIALIZED = True
 
     write_report(log, lines)
     print(f"Log: {log}")
@@ -335,8 +593,7 @@ def system_update(_: argparse.Namespace) -> int:
 def update(_: argparse.Namespace) -> int:
     if _require_cmd("pacman"):
         return 1
-    run_cmd(["pacman-key", "--init"], sudo=True)
-    run_cmd(["pacman-key", "--populate"], sudo=True)
+    _ensure_keyring()
     cp = run_cmd(["pacman", "-Syu", "--noconfirm"], sudo=True)
     print_cmd(cp)
     return cp.returncode
@@ -345,8 +602,7 @@ def update(_: argparse.Namespace) -> int:
 def upgrade_packages(_: argparse.Namespace) -> int:
     if _require_cmd("pacman"):
         return 1
-    run_cmd(["pacman-key", "--init"], sudo=True)
-    run_cmd(["pacman-key", "--populate"], sudo=True)
+    _ensure_keyring()
     ref = run_cmd(["pacman", "-Syy", "--noconfirm"], sudo=True)
     print_cmd(ref)
     if ref.returncode != 0:
@@ -357,9 +613,12 @@ def upgrade_packages(_: argparse.Namespace) -> int:
 
 
 def test_internet_connection(args: argparse.Namespace) -> int:
+    from concurrent.futures import ThreadPoolExecutor
+
     ok = False
-    for s in args.servers:
-        cp = run_cmd(["ping", "-c", str(args.count), s])
+    with ThreadPoolExecutor(max_workers=max(1, len(args.servers))) as ex:
+        results = list(ex.map(lambda host: run_cmd(["ping", "-c", str(args.count), host]), args.servers))
+    for s, cp in zip(args.servers, results):
         if cp.returncode == 0:
             print(f"OK: {s}")
             ok = True
@@ -369,11 +628,10 @@ def test_internet_connection(args: argparse.Namespace) -> int:
 
 
 def show_ip_address(_: argparse.Namespace) -> int:
-    cp = run_shell("hostname -I | awk '{print $1}'")
-    ip = (cp.stdout or "").strip()
+    ip = _first_field(_stdout(["hostname", "-I"]))
     if not ip:
-        cp = run_shell("ip addr show | grep 'inet ' | grep -v '127.0.0.1' | awk '{print $2}' | cut -d '/' -f1 | head -n 1")
-        ip = (cp.stdout or "").strip()
+        addrs = [a for a in _RE_INET.findall(_stdout(["ip", "addr", "show"])) if a != "127.0.0.1"]
+        ip = addrs[0] if addrs else ""
     if ip:
         print(ip)
         return 0
@@ -400,38 +658,51 @@ def network_speed(args: argparse.Namespace) -> int:
 
 
 def network_overview(args: argparse.Namespace) -> int:
+    from concurrent.futures import ThreadPoolExecutor
+
+    has_nmcli = command_exists("nmcli")
+    has_dig = command_exists("dig")
+    has_curl = command_exists("curl")
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        jobs = {
+            "ping": ex.submit(run_cmd, ["ping", "-c", "4", "-W", "1", "8.8.8.8"]),
+            "hostname": ex.submit(_stdout, ["hostname", "-I"]),
+            "route": ex.submit(_stdout, ["ip", "route"]),
+        }
+        if has_nmcli:
+            jobs["nmcli"] = ex.submit(_stdout, ["nmcli", "-t", "-f", "DEVICE,TYPE", "connection", "show", "--active"])
+        if has_dig:
+            jobs["dig"] = ex.submit(_stdout, ["dig", "+short", "google.com"])
+        if has_curl:
+            jobs["curl"] = ex.submit(_stdout, ["curl", "-s", "-o", "/dev/null", "-w", "%{http_code}", "https://www.google.com"])
+
     summary: dict[str, str] = {}
-    summary["internet_status"] = "Working" if run_cmd(["ping", "-c", "2", "8.8.8.8"]).returncode == 0 else "Not Working"
-    summary["ip_address"] = (run_shell("hostname -I | awk '{print $1}'").stdout or "").strip() or "Unknown"
-    summary["default_gateway"] = (run_shell("ip route | grep default | awk '{print $3}'").stdout or "").strip() or "Unknown"
-    if command_exists("nmcli"):
-        summary["connection_type"] = ((run_shell("nmcli -t -f DEVICE,TYPE connection show --active | awk -F: '{print $2}'").stdout or "").strip().splitlines() or ["Unknown"])[0]
+    p = jobs["ping"].result()
+    summary["internet_status"] = "Working" if p.returncode == 0 else "Not Working"
+    summary["ip_address"] = _first_field(jobs["hostname"].result()) or "Unknown"
+    gateways = [f[2] for f in (line.split() for line in jobs["route"].result().splitlines() if "default" in line) if len(f) > 2]
+    summary["default_gateway"] = "\n".join(gateways) or "Unknown"
+    if has_nmcli:
+        types = [line.split(":")[1] for line in jobs["nmcli"].result().splitlines() if ":" in line]
+        summary["connection_type"] = types[0] if types else "Unknown"
     else:
         summary["connection_type"] = "nmcli not installed"
 
-    p = run_cmd(["ping", "-c", "4", "8.8.8.8"])
     comb = (p.stdout or "") + "\n" + (p.stderr or "")
-    lm = re.search(r"=\s*[\d.]+/([\d.]+)/", comb)
-    pm = re.search(r"([\d.]+)%\s+packet loss", comb)
+    lm = _RE_PING_LATENCY.search(comb)
+    pm = _RE_PING_LOSS.search(comb)
     summary["avg_latency_ms"] = lm.group(1) if lm else "Unknown"
     summary["packet_loss_percent"] = pm.group(1) if pm else "Unknown"
 
-    if command_exists("dig"):
-        summary["dns_lookup_google"] = (run_cmd(["dig", "+short", "google.com"]).stdout or "").strip() or "Failed"
-    else:
-        summary["dns_lookup_google"] = "dig not installed"
-
-    if command_exists("curl"):
-        summary["http_status"] = (run_cmd(["curl", "-s", "-o", "/dev/null", "-w", "%{http_code}", "https://www.google.com"]).stdout or "").strip() or "Unknown"
-    else:
-        summary["http_status"] = "curl not installed"
+    summary["dns_lookup_google"] = (jobs["dig"].result() or "Failed") if has_dig else "dig not installed"
+    summary["http_status"] = (jobs["curl"].result() or "Unknown") if has_curl else "curl not installed"
 
     if args.gather_stats:
         out = Path(args.stats_file)
         lines: list[str] = []
         for cmd in ["ip -s link", "ip route", "netstat -tunlp"]:
             lines.append(f"$ {cmd}")
-            cp = run_shell(cmd)
+            cp = run_cmd(cmd.split())
             lines.append((cp.stdout or "").strip())
             if cp.stderr:
                 lines.append(cp.stderr.strip())
@@ -443,45 +714,120 @@ def network_overview(args: argparse.Namespace) -> int:
     return 0
 
 
-def show_system_specs(_: argparse.Namespace) -> int:
-    cmds = [
-        "hostname",
-        "cat /etc/os-release | grep PRETTY_NAME",
-        "uname -r",
-        "lscpu | grep -E 'Model name|Socket|Core|Thread|Flags'",
-        "free -h | awk '/Mem:/ {print \"Total: \" $2 \", Used: \" $3 \", Free: \" $4}'",
-        "df -h --output=source,size,used,avail,pcent",
-        "lsblk -o NAME,SIZE,FSTYPE,MOUNTPOINT",
-        "ip -br addr show",
-        "lspci | grep -i vga",
-        "lspci -k | grep -A 3 VGA | grep 'Kernel driver'",
-    ]
-    for c in cmds:
-        print(f"\n$ {c}")
-        cp = run_shell(c)
-        print_cmd(cp)
+_PSEUDO_FS = frozenset({
+    "proc", "sysfs", "devtmpfs", "devpts", "tmpfs", "cgroup", "cgroup2", "securityfs", "pstore",
+    "debugfs", "tracefs", "configfs", "mqueue", "hugetlbfs", "autofs", "bpf", "fusectl",
+    "binfmt_misc", "efivarfs", "ramfs", "squashfs", "nsfs", "rpc_pipefs",
+})
+
+
+def _mem_summary() -> str:
+    info: dict[str, int] = {}
+    try:
+        with open("/proc/meminfo", encoding="ascii") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                fields = rest.split()
+                if fields:
+                    info[key] = int(fields[0]) * 1024
+    except (OSError, ValueError):
+        return _free_summary()
+    total = info.get("MemTotal")
+    avail = info.get("MemAvailable", info.get("MemFree"))
+    if total is None or avail is None:
+        return _free_summary()
+    return f"Total: {_human(total)}, Used: {_human(total - avail)}, Free: {_human(avail)}"
+
+
+def _free_summary() -> str:
+    for line in _stdout(["free", "-h"]).splitlines():
+        f = line.split()
+        if f and f[0] == "Mem:" and len(f) > 3:
+            return f"Total: {f[1]}, Used: {f[2]}, Free: {f[3]}"
+    return ""
+
+
+def _disk_summary(limit: int | None = None) -> str:
+    rows = [f"{'Filesystem':<24} {'Size':>9} {'Used':>9} {'Avail':>9} {'Use%':>5}"]
+    seen: set[str] = set()
+    try:
+        with open("/proc/self/mounts", encoding="utf-8", errors="replace") as f:
+            mounts = [line.split() for line in f]
+    except OSError:
+        mounts = []
+    for fields in mounts:
+        if len(fields) < 3 or fields[2] in _PSEUDO_FS or fields[0] in seen:
+            continue
+        mountpoint = fields[1].replace("\\040", " ")
+        try:
+            st = os.statvfs(mountpoint)
+        except OSError:
+            continue
+        if st.f_blocks == 0:
+            continue
+        seen.add(fields[0])
+        size = st.f_blocks * st.f_frsize
+        used = (st.f_blocks - st.f_bfree) * st.f_frsize
+        avail = st.f_bavail * st.f_frsize
+        pct = round(100 * used / (used + avail)) if used + avail else 0
+        rows.append(f"{fields[0]:<24} {_human(size):>9} {_human(used):>9} {_human(avail):>9} {pct:>4}%")
+    if len(rows) == 1:
+        out = _stdout(["df", "-h", "--output=source,size,used,avail,pcent"])
+        return _head(out, limit) if limit else out
+    return "\n".join(rows[:limit] if limit else rows)
+
+
+def _vga_kernel_driver() -> str:
+    lines = _stdout(["lspci", "-k"]).splitlines()
+    found: list[str] = []
+    for i, line in enumerate(lines):
+        if "VGA" in line:
+            found.extend(x for x in lines[i + 1 : i + 4] if "Kernel driver" in x)
+    return "\n".join(found)
+
+
+def _run_checks(checks: list[tuple[str, Callable[[], str]]]) -> int:
+    for label, fn in checks:
+        print(f"\n$ {label}")
+        out = fn()
+        if out:
+            print(out.strip())
     return 0
 
 
+def show_system_specs(_: argparse.Namespace) -> int:
+    return _run_checks([
+        ("hostname", lambda: os.uname().nodename),
+        ("cat /etc/os-release | grep PRETTY_NAME", lambda: f'PRETTY_NAME="{_os_release()["PRETTY_NAME"]}"' if "PRETTY_NAME" in _os_release() else ""),
+        ("uname -r", lambda: os.uname().release),
+        ("lscpu | grep -E 'Model name|Socket|Core|Thread|Flags'", lambda: _grep(_stdout(["lscpu"]), "Model name", "Socket", "Core", "Thread", "Flags")),
+        ("memory", _mem_summary),
+        ("disk usage", _disk_summary),
+        ("lsblk -o NAME,SIZE,FSTYPE,MOUNTPOINT", lambda: _stdout(["lsblk", "-o", "NAME,SIZE,FSTYPE,MOUNTPOINT"])),
+        ("ip -br addr show", lambda: _stdout(["ip", "-br", "addr", "show"])),
+        ("lspci | grep -i vga", lambda: _grep(_stdout(["lspci"]), "vga", ignore_case=True)),
+        ("lspci -k | grep -A 3 VGA | grep 'Kernel driver'", _vga_kernel_driver),
+    ])
+
+
 def system_overview(_: argparse.Namespace) -> int:
-    cmds = [
-        "hostname",
-        "uname -o",
-        "uname -r",
-        "lscpu | grep 'Model name' | cut -d: -f2 | xargs",
-        "free -h | awk '/Mem:/ {print \"Total: \" $2 \", Used: \" $3 \", Free: \" $4}'",
-        "df -h --output=source,size,used,avail,pcent | head -n 5",
-        "ip -br addr show",
-        "pacman -Qe | wc -l",
-        "uptime -p",
-        "checkupdates 2>/dev/null | wc -l",
-        "journalctl -p 3 -b --no-pager | tail -n 3",
-    ]
-    for c in cmds:
-        print(f"\n$ {c}")
-        cp = run_shell(c)
-        print_cmd(cp)
-    return 0
+    def cpu_model() -> str:
+        line = _grep(_stdout(["lscpu"]), "Model name").split("\n")[0]
+        return line.split(":", 1)[1].strip() if ":" in line else ""
+
+    return _run_checks([
+        ("hostname", lambda: os.uname().nodename),
+        ("uname -o", lambda: _stdout(["uname", "-o"])),
+        ("uname -r", lambda: os.uname().release),
+        ("lscpu | grep 'Model name'", cpu_model),
+        ("memory", _mem_summary),
+        ("disk usage", lambda: _disk_summary(5)),
+        ("ip -br addr show", lambda: _stdout(["ip", "-br", "addr", "show"])),
+        ("pacman -Qe | wc -l", lambda: str(len(_stdout(["pacman", "-Qe"]).splitlines()))),
+        ("uptime -p", lambda: _stdout(["uptime", "-p"])),
+        ("checkupdates | wc -l", lambda: str(len(_stdout(["checkupdates"]).splitlines()))),
+        ("journalctl -p 3 -b --no-pager | tail -n 3", lambda: _tail(_stdout(["journalctl", "-p", "3", "-b", "--no-pager"]), 3)),
+    ])
 
 
 def clear_thumbnail_cache(args: argparse.Namespace) -> int:
@@ -492,11 +838,8 @@ def clear_thumbnail_cache(args: argparse.Namespace) -> int:
     print(f"Before: {dir_size_human(str(d))}")
     if not ask_yes_no("Clear thumbnail cache?", assume_yes=args.yes):
         return 0
-    for c in d.iterdir():
-        try:
-            shutil.rmtree(c) if c.is_dir() else c.unlink(missing_ok=True)
-        except Exception as exc:
-            print(f"Failed to remove {c}: {exc}")
+    _purge_dir(d)
+    _DIR_SIZE_CACHE.pop(str(d), None)
     print(f"After: {dir_size_human(str(d))}")
     return 0
 
@@ -509,11 +852,8 @@ def clear_user_cache(args: argparse.Namespace) -> int:
     print(f"Before: {dir_size_human(str(d))}")
     if not ask_yes_no(f"Clear all contents in {d}?", assume_yes=args.yes):
         return 0
-    for c in d.iterdir():
-        try:
-            shutil.rmtree(c) if c.is_dir() else c.unlink(missing_ok=True)
-        except Exception as exc:
-            print(f"Failed to remove {c}: {exc}")
+    _purge_dir(d)
+    _DIR_SIZE_CACHE.pop(str(d), None)
     print(f"After: {dir_size_human(str(d))}")
     return 0
 
@@ -532,14 +872,17 @@ def clear_aur_cache(args: argparse.Namespace) -> int:
 def remove_old_kernels(args: argparse.Namespace) -> int:
     if _require_cmd("pacman"):
         return 1
-    current = (run_cmd(["uname", "-r"]).stdout or "").strip().split("-")[0]
-    pkg_lines = run_cmd(["pacman", "-Q"]).stdout.splitlines()
-    kernels = [line.split()[0] for line in pkg_lines if line.startswith("linux")]
-    remove: list[str] = []
-    for k in kernels:
-        info = run_cmd(["pacman", "-Qi", k]).stdout
-        if current and current not in info:
-            remove.append(k)
+    current = os.uname().release.split("-")[0]
+    total, _ = _pacman_inventory()
+    kernels = [name for name in total if name.startswith("linux")]
+    versions: dict[str, str] = {}
+    if kernels:
+        info = run_cmd(["pacman", "-Qi", *kernels]).stdout or ""
+        for para in info.split("\n\n"):
+            m = _RE_PKG_NAME_VERSION.search(para)
+            if m:
+                versions[m.group(1)] = m.group(2)
+    remove = [k for k, v in versions.items() if current and current not in v]
     if not remove:
         print("No old kernel packages found.")
         return 0
@@ -577,9 +920,11 @@ def deep_clean(args: argparse.Namespace) -> int:
 
 
 def _list_dir_names(path: Path) -> list[str]:
-    if not path.exists() or not path.is_dir():
+    try:
+        with os.scandir(path) as it:
+            return sorted(e.name for e in it if e.is_dir())
+    except OSError:
         return []
-    return sorted([p.name for p in path.iterdir() if p.is_dir()])
 
 
 def _apply_gsettings(key: str, value: str) -> int:
@@ -665,14 +1010,21 @@ def change_grub_theme(args: argparse.Namespace) -> int:
     if not ask_yes_no(f"Apply GRUB theme '{theme}'?", assume_yes=args.yes):
         return 0
     theme_txt = themes_dir / theme / "theme.txt"
-    sed = run_shell(
-        f"sed -i 's|^GRUB_THEME=.*|GRUB_THEME=\"{theme_txt}\"|' /etc/default/grub",
-        sudo=True,
-    )
+    grub = Path("/etc/default/grub")
+    try:
+        text = grub.read_text(encoding="utf-8")
+    except OSError as exc:
+        print(f"Cannot read {grub}: {exc}")
+        return 1
+    line = f'GRUB_THEME="{theme_txt}"'
+    new_text, n = _RE_GRUB_THEME.subn(lambda _: line, text, count=1)
+    if not n:
+        new_text = text + ("" if text.endswith("\n") or not text else "\n") + line + "\n"
+    wr = _write_root_file(grub, new_text)
     mk = run_cmd(["grub-mkconfig", "-o", "/boot/grub/grub.cfg"], sudo=True)
-    print_cmd(sed)
+    print_cmd(wr)
     print_cmd(mk)
-    return 0 if sed.returncode == 0 and mk.returncode == 0 else 1
+    return 0 if wr.returncode == 0 and mk.returncode == 0 else 1
 
 
 def change_plymouth_theme(args: argparse.Namespace) -> int:
@@ -697,13 +1049,7 @@ def change_plymouth_theme(args: argparse.Namespace) -> int:
     if set_cp.returncode != 0:
         return set_cp.returncode
 
-    distro = ""
-    osrel = Path("/etc/os-release")
-    if osrel.exists():
-        txt = osrel.read_text(encoding="utf-8", errors="ignore")
-        m = re.search(r"^ID=(.+)$", txt, re.MULTILINE)
-        if m:
-            distro = m.group(1).strip().strip('"').lower()
+    distro = _os_release().get("ID", "").lower()
 
     if distro in {"arch", "manjaro"} and command_exists("mkinitcpio"):
         cp = run_cmd(["mkinitcpio", "-P"], sudo=True)
@@ -750,39 +1096,46 @@ def customize_terminal_colors(args: argparse.Namespace) -> int:
         print(f"Unknown scheme: {scheme}")
         return 1
 
-    profile = run_shell("gsettings get org.gnome.Terminal.Legacy.ProfilesList default | tr -d " + '"\'' + "").stdout.strip()
+    profile = _stdout(["gsettings", "get", "org.gnome.Terminal.Legacy.ProfilesList", "default"]).replace("'", "").replace('"', "")
     if not profile:
         print("Could not detect default GNOME Terminal profile")
         return 1
 
     ppath = f"/org/gnome/terminal/legacy/profiles:/:{profile}/"
-    cp1 = run_cmd(["dconf", "write", f"{ppath}use-theme-colors", "false"])
-    cp2 = run_cmd(["dconf", "write", f"{ppath}palette", schemes[scheme]["palette"]])
-    cp3 = run_cmd(["dconf", "write", f"{ppath}background-color", schemes[scheme]["bg"]])
-    cp4 = run_cmd(["dconf", "write", f"{ppath}foreground-color", schemes[scheme]["fg"]])
-    for cp in (cp1, cp2, cp3, cp4):
-        print_cmd(cp)
-    return 0 if all(cp.returncode == 0 for cp in (cp1, cp2, cp3, cp4)) else 1
+    ini = (
+        "[/]\n"
+        "use-theme-colors=false\n"
+        f"palette={schemes[scheme]['palette']}\n"
+        f"background-color={schemes[scheme]['bg']}\n"
+        f"foreground-color={schemes[scheme]['fg']}\n"
+    )
+    cp = run_cmd(["dconf", "load", ppath], input=ini)
+    print_cmd(cp)
+    return cp.returncode
 
 
 def install_fonts(args: argparse.Namespace) -> int:
     if _require_cmd("fc-list"):
         return 1
-    fonts = sorted(set((run_shell("fc-list : family | sort -u").stdout or "").splitlines()))
-    fonts = [f.strip() for f in fonts if f.strip()]
-    if not fonts:
-        print("No fonts found.")
-        return 1
     if args.list:
+        fonts = sorted({f.strip() for f in _stdout(["fc-list", ":", "family"]).splitlines() if f.strip()})
+        if not fonts:
+            print("No fonts found.")
+            return 1
         print("\n".join(fonts))
         return 0
     font = args.font or input("Enter font name to apply: ").strip()
-    match = next((f for f in fonts if font.lower() in f.lower()), None)
+    needle = font.lower()
+    # fc-list warnings name conf files (e.g. 66-noto-sans.conf) that could match the needle.
+    families = _stream_lines(["fc-list", ":", "family"], stderr=subprocess.DEVNULL)
+    match = next((f.strip() for f in families if needle in f.lower()), None)
     if not match:
         print(f"Font not found: {font}")
         return 1
-    cp1 = run_cmd(["gsettings", "set", "org.gnome.desktop.interface", "monospace-font-name", match])
-    cp2 = run_cmd(["gsettings", "set", "org.gnome.desktop.interface", "font-name", match])
+    cp1, cp2 = run_many([
+        ["gsettings", "set", "org.gnome.desktop.interface", "monospace-font-name", match],
+        ["gsettings", "set", "org.gnome.desktop.interface", "font-name", match],
+    ])
     print_cmd(cp1)
     print_cmd(cp2)
     return 0 if cp1.returncode == 0 and cp2.returncode == 0 else 1
@@ -802,8 +1155,8 @@ def manage_startup_apps(args: argparse.Namespace) -> int:
             return 0
         for f in files:
             txt = f.read_text(encoding="utf-8", errors="ignore")
-            name = re.search(r"^Name=(.*)$", txt, re.MULTILINE)
-            enabled = re.search(r"^X-GNOME-Autostart-enabled=(.*)$", txt, re.MULTILINE)
+            name = _RE_DESKTOP_NAME.search(txt)
+            enabled = _RE_DESKTOP_ENABLED.search(txt)
             print(f"{f.name}: name={name.group(1) if name else 'N/A'} enabled={enabled.group(1) if enabled else 'true'}")
         return 0
 
@@ -818,12 +1171,13 @@ def manage_startup_apps(args: argparse.Namespace) -> int:
             f"Name={args.name}",
             f"Exec={args.exec_cmd}",
             "Terminal=false",
-            "X-GNOME-Autostart-enabled=true",
+            _AUTOSTART_TRUE,
         ]
         if args.comment:
             lines.append(f"Comment={args.comment}")
-        file.write_text("\n".join(lines) + "\n", encoding="utf-8")
-        file.chmod(0o644)
+        fd = os.open(file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
         print(f"Added startup entry: {file}")
         return 0
 
@@ -840,17 +1194,19 @@ def manage_startup_apps(args: argparse.Namespace) -> int:
             print(f"Removed startup entry: {file}")
             return 0
 
-        txt = file.read_text(encoding="utf-8", errors="ignore")
-        if "X-GNOME-Autostart-enabled=false" in txt:
-            txt = txt.replace("X-GNOME-Autostart-enabled=false", "X-GNOME-Autostart-enabled=true")
-            state = "enabled"
-        elif "X-GNOME-Autostart-enabled=true" in txt:
-            txt = txt.replace("X-GNOME-Autostart-enabled=true", "X-GNOME-Autostart-enabled=false")
-            state = "disabled"
-        else:
-            txt += "\nX-GNOME-Autostart-enabled=false\n"
-            state = "disabled"
-        file.write_text(txt, encoding="utf-8")
+        with file.open("r+", encoding="utf-8", errors="surrogateescape") as f:
+            txt = f.read()
+            m = _AUTOSTART_RE.search(txt)
+            if m:
+                value = "false" if m.group(1) == "true" else "true"
+                txt = txt[: m.start(1)] + value + txt[m.end(1) :]
+                state = "enabled" if value == "true" else "disabled"
+            else:
+                txt += f"\n{_AUTOSTART_FALSE}\n"
+                state = "disabled"
+            f.seek(0)
+            f.write(txt)
+            f.truncate()
         print(f"Toggled startup entry: {file} -> {state}")
         return 0
 
@@ -858,6 +1214,23 @@ def manage_startup_apps(args: argparse.Namespace) -> int:
     return 1
 
 
+def _copy_file(source: Path, target: Path, *, no_clobber: bool = False) -> subprocess.CompletedProcess[str]:
+    cmd = ["cp", *(["-n"] if no_clobber else []), str(source), str(target)]
+    if not os.access(target.parent, os.W_OK):
+        return run_cmd(cmd, sudo=True)
+    try:
+        if no_clobber:
+            with source.open("rb") as src, target.open("xb") as dst:
+                shutil.copyfileobj(src, dst)
+        else:
+            shutil.copyfile(source, target)
+    except FileExistsError:
+        pass
+    except OSError as exc:
+        return subprocess.CompletedProcess(cmd, 1, "", str(exc))
+    return subprocess.CompletedProcess(cmd, 0, "", "")
+
+
 def manage_system_sounds(args: argparse.Namespace) -> int:
     if _require_cmd("gsettings"):
         return 1
@@ -876,17 +1249,17 @@ def manage_system_sounds(args: argparse.Namespace) -> int:
         if not args.sound_file:
             print("--sound-file required")
             return 1
-        source = Path(args.sound_file).expanduser().resolve()
+        source = Path(args.sound_file).expanduser().absolute()
         if not source.exists():
             print(f"Sound file not found: {source}")
             return 1
         target = Path("/usr/share/sounds/freedesktop/stereo/desktop-login.oga")
         backup = Path.home() / ".local" / "share" / "sounds" / "desktop-login-backup.oga"
         backup.parent.mkdir(parents=True, exist_ok=True)
-        if target.exists() and not backup.exists():
-            cp = run_cmd(["cp", str(target), str(backup)], sudo=True)
+        cp = _copy_file(target, backup, no_clobber=True)
+        if cp.returncode != 0:
             print_cmd(cp)
-        cp2 = run_cmd(["cp", str(source), str(target)], sudo=True)
+        cp2 = _copy_file(source, target)
         print_cmd(cp2)
         return cp2.returncode
 
@@ -894,6 +1267,74 @@ def manage_system_sounds(args: argparse.Namespace) -> int:
     return 1
 
 
+def _gio_set_strings(schema: str, values: dict[str, str]) -> bool:
+    try:
+        import gi
+
+        gi.require_version("Gio", "2.0")
+        from gi.repository import Gio
+
+        source = Gio.SettingsSchemaSource.get_default()
+        if source is None or source.lookup(schema, True) is None:
+            return False
+        settings = Gio.Settings.new(schema)
+        settings.delay()
+        for key, value in values.items():
+            settings.set_string(key, value)
+        settings.apply()
+        Gio.Settings.sync()
+        return True
+    except Exception:
+        return False
+
+
+_WALLPAPER_EXTS = (".jpg", ".png")
+
+
+def _walk_images(root: str) -> Iterator[str]:
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for e in it:
+                    if e.is_dir(follow_symlinks=False):
+                        stack.append(e.path)
+                    elif e.name.endswith(_WALLPAPER_EXTS) and e.is_file(follow_symlinks=False):
+                        yield e.path
+        except OSError:
+            continue
+
+
+def _set_background(wp: Path, *, wayland: bool) -> int:
+    uri = f"file://{wp}"
+    if wayland and _gio_set_strings("org.gnome.desktop.background", {"picture-uri": uri, "picture-uri-dark": uri}):
+        return 0
+    cmds = [["gsettings", "set", "org.gnome.desktop.background", "picture-uri", uri]]
+    if wayland:
+        cmds.append(["gsettings", "set", "org.gnome.desktop.background", "picture-uri-dark", uri])
+    elif command_exists("feh"):
+        cmds.append(["feh", "--bg-scale", str(wp)])
+    results = run_many(cmds)
+    for cp in results:
+        print_cmd(cp)
+    return 0 if all(cp.returncode == 0 for cp in results) else 1
+
+
+def _repair_git_repo(path: Path, url: str) -> bool:
+    """Restore a damaged checkout from a shallow fetch instead of cloning it again."""
+    if run_cmd(["git", "-C", str(path), "status", "--porcelain", "--untracked-files=no"]).returncode == 0:
+        return True
+    for cmd in (
+        ["git", "-C", str(path), "fetch", "--depth=1", url],
+        ["git", "-C", str(path), "reset", "--hard", "FETCH_HEAD"],
+    ):
+        cp = run_cmd(cmd)
+        print_cmd(cp)
+        if cp.returncode != 0:
+            return False
+    return True
+
+
 def set_dynamic_wallpaper(args: argparse.Namespace) -> int:
     home = get_target_home()
     repo_url = "https://github.com/adi1090x/dynamic-wallpaper.git"
@@ -906,41 +1347,35 @@ def set_dynamic_wallpaper(args: argparse.Namespace) -> int:
 
     if args.status:
         print(f"repo_dir={repo_dir} exists={repo_dir.exists()}")
+        print(f"wallpapers={sum(1 for _ in _walk_images(str(repo_dir / 'wallpapers')))}")
         print(f"log_file={log_file}")
         return 0
 
     if args.apply_wallpaper:
-        wp = Path(args.apply_wallpaper).expanduser().resolve()
+        wp = Path(args.apply_wallpaper).expanduser().absolute()
         if not wp.exists():
             print(f"Wallpaper not found: {wp}")
             return 1
-        if os.environ.get("XDG_SESSION_TYPE") == "wayland":
-            c1 = run_cmd(["gsettings", "set", "org.gnome.desktop.background", "picture-uri", f"file://{wp}"])
-            c2 = run_cmd(["gsettings", "set", "org.gnome.desktop.background", "picture-uri-dark", f"file://{wp}"])
-            print_cmd(c1)
-            print_cmd(c2)
-            return 0 if c1.returncode == 0 and c2.returncode == 0 else 1
-        c1 = run_cmd(["gsettings", "set", "org.gnome.desktop.background", "picture-uri", f"file://{wp}"])
-        print_cmd(c1)
-        if command_exists("feh"):
-            c2 = run_cmd(["feh", "--bg-scale", str(wp)])
-            print_cmd(c2)
-            return 0 if c1.returncode == 0 and c2.returncode == 0 else 1
-        return c1.returncode
+        return _set_background(wp, wayland=os.environ.get("XDG_SESSION_TYPE") == "wayland")
 
     if not args.install:
         print("Use --install, --status, or --apply-wallpaper")
         return 0
 
     repo_dir.parent.mkdir(parents=True, exist_ok=True)
-    if repo_dir.exists() and not (repo_dir / ".git").exists():
+    if repo_dir.exists() and (repo_dir / ".git").exists():
+        repaired = _repair_git_repo(repo_dir, repo_url)
+        log(f"repair ok={repaired}")
+    else:
+        repaired = False
+    if repo_dir.exists() and not repaired:
         if ask_yes_no("Repository folder looks invalid. Recreate?", assume_yes=args.yes):
             shutil.rmtree(repo_dir)
 
     if not repo_dir.exists():
         if not ask_yes_no("Clone dynamic-wallpaper repository (~1GB)?", assume_yes=args.yes):
             return 0
-        cp = run_cmd(["git", "clone", repo_url, str(repo_dir)])
+        cp = run_cmd(["git", "clone", "--depth=1", repo_url, str(repo_dir)])
         print_cmd(cp)
         log(f"clone rc={cp.returncode}")
         if cp.returncode != 0:
@@ -949,22 +1384,42 @@ def set_dynamic_wallpaper(args: argparse.Namespace) -> int:
     if args.enable_auto:
         change_script = home / ".local" / "bin" / "change-wallpaper"
         change_script.parent.mkdir(parents=True, exist_ok=True)
-        change_script.write_text(
+        script = (
             "#!/bin/bash\n"
             "WALLPAPER_DIR=\"$HOME/.local/share/dynamic-wallpaper/wallpapers\"\n"
-            "WALLPAPER=$(find \"$WALLPAPER_DIR\" -type f \\( -name '*.jpg' -o -name '*.png' \\) | shuf -n 1)\n"
+            "INDEX=\"$HOME/.local/share/dynamic-wallpaper-index.txt\"\n"
+            "if [ ! -s \"$INDEX\" ] || [ -n \"$(find \"$INDEX\" -mtime +7)\" ]; then\n"
+            "  find \"$WALLPAPER_DIR\" -type f \\( -name '*.jpg' -o -name '*.png' \\) > \"$INDEX\"\n"
+            "fi\n"
+            "WALLPAPER=$(shuf -n 1 \"$INDEX\")\n"
             "if [ \"$XDG_SESSION_TYPE\" = \"wayland\" ]; then\n"
             "  gsettings set org.gnome.desktop.background picture-uri \"file://$WALLPAPER\"\n"
             "  gsettings set org.gnome.desktop.background picture-uri-dark \"file://$WALLPAPER\"\n"
             "else\n"
             "  gsettings set org.gnome.desktop.background picture-uri \"file://$WALLPAPER\"\n"
             "  feh --bg-scale \"$WALLPAPER\"\n"
-            "fi\n",
-            encoding="utf-8",
+            "fi\n"
         )
-        change_script.chmod(0o755)
-        cron = run_shell(f"(crontab -l 2>/dev/null; echo '0 * * * * {change_script}') | crontab -")
-        print_cmd(cron)
+        try:
+            unchanged = change_script.read_bytes() == script.encode("utf-8") and os.access(change_script, os.X_OK)
+        except OSError:
+            unchanged = False
+        if not unchanged:
+            change_script.write_text(script, encoding="utf-8")
+            change_script.chmod(0o755)
+        index = home / ".local" / "share" / "dynamic-wallpaper-index.txt"
+        with index.open("w", encoding="utf-8") as f:
+            f.writelines(f"{p}\n" for p in _walk_images(str(repo_dir / "wallpapers")))
+        entry = f"0 * * * * {change_script}"
+        current = run_cmd(["crontab", "-l"])
+        cur_text = (current.stdout or "") if current.returncode == 0 else ""
+        if entry in cur_text.splitlines():
+            cron = subprocess.CompletedProcess(["crontab", "-"], 0, "", "")
+        else:
+            if cur_text and not cur_text.endswith("\n"):
+                cur_text += "\n"
+            cron = run_cmd(["crontab", "-"], input=f"{cur_text}{entry}\n")
+            print_cmd(cron)
         log(f"enable_auto rc={cron.returncode}")
         return cron.returncode
 
@@ -973,7 +1428,63 @@ def set_dynamic_wallpaper(args: argparse.Namespace) -> int:
     return 0
 
 
+def _failed_units_dbus() -> str | None:
+    try:
+        from pystemd.systemd1 import Manager
+
+        with Manager() as manager:
+            units = manager.Manager.ListUnitsFiltered([b"failed"])
+    except Exception:
+        return None
+
+    def text(v: object) -> str:
+        return v.decode(errors="replace") if isinstance(v, bytes) else str(v)
+
+    return "\n".join(f"{text(u[0])} {text(u[2])} {text(u[3])} {text(u[4])} {text(u[1])}" for u in units)
+
+
+def _journal_errors_native(count: int) -> str | None:
+    try:
+        from systemd import journal
+
+        reader = journal.Reader()
+        reader.log_level(journal.LOG_ERR)
+        reader.seek_tail()
+        entries = []
+        for _ in range(count):
+            entry = reader.get_previous()
+            if not entry:
+                break
+            entries.append(entry)
+    except Exception:
+        return None
+    out: list[str] = []
+    for e in reversed(entries):
+        ts = e.get("__REALTIME_TIMESTAMP")
+        stamp = ts.strftime("%b %d %H:%M:%S") if isinstance(ts, dt.datetime) else ""
+        ident = e.get("SYSLOG_IDENTIFIER", "")
+        pid = f"[{e['_PID']}]" if "_PID" in e else ""
+        out.append(f"{stamp} {e.get('_HOSTNAME', '')} {ident}{pid}: {e.get('MESSAGE', '')}")
+    return "\n".join(out)
+
+
+_NATIVE_PROBES: dict[str, Callable[[], str | None]] = {
+    "services": _failed_units_dbus,
+    "journal_errors": lambda: _journal_errors_native(50),
+}
+
+
+def _run_probe(name: str, cmd: list[str]) -> subprocess.CompletedProcess[str]:
+    native = _NATIVE_PROBES.get(name)
+    out = native() if native else None
+    if out is not None:
+        return subprocess.CompletedProcess(cmd, 0, out, "")
+    return run_cmd(cmd)
+
+
 def deep_debug(args: argparse.Namespace) -> int:
+    from concurrent.futures import ThreadPoolExecutor
+
     report = Path(args.report or (get_target_home() / "debug_report.txt"))
     lines: list[str] = [f"Timestamp: {now()}", "Deep Debug Report"]
 
@@ -990,34 +1501,36 @@ def deep_debug(args: argparse.Namespace) -> int:
         "usb": ["sh", "-lc", "lsusb 2>/dev/null || true"],
     }
 
+    has_pacman = command_exists("pacman")
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        futures = {name: ex.submit(_run_probe, name, cmd) for name, cmd in checks.items()}
+        if has_pacman:
+            orphans_f = ex.submit(run_cmd, ["pacman", "-Qdtq"])
+            broken_f = ex.submit(lambda: "\n".join(_pacman_qk_problems()))
+
     summary_issues: list[str] = []
-    for name, cmd in checks.items():
-        lines.append(f"\n=== {name} ===")
-        cp = run_cmd(cmd)
-        out = (cp.stdout or "").strip()
+    for name, fut in futures.items():
+        cp = fut.result()
         err = (cp.stderr or "").strip()
-        lines.append(out)
-        if err:
-            lines.append(err)
+        section = (f"\n=== {name} ===", (cp.stdout or "").strip(), err)
+        lines.extend(section if err else section[:2])
         if cp.returncode != 0 and name not in {"gpu", "usb"}:
             summary_issues.append(f"{name} check failed")
 
-    if command_exists("pacman"):
-        orphans = run_cmd(["pacman", "-Qdtq"])
+    if has_pacman:
+        orphans = orphans_f.result()
         if (orphans.stdout or "").strip():
             summary_issues.append("orphan packages detected")
-            lines.append("\n=== orphan_packages ===")
-            lines.append((orphans.stdout or "").strip())
+            lines.extend(("\n=== orphan_packages ===", (orphans.stdout or "").strip()))
 
-        broken = run_shell("pacman -Qk 2>&1 | grep -v ' 0 missing files' || true")
-        if (broken.stdout or "").strip():
+        broken = broken_f.result().strip()
+        if broken:
             summary_issues.append("broken package files detected")
-            lines.append("\n=== broken_packages ===")
-            lines.append((broken.stdout or "").strip())
+            lines.extend(("\n=== broken_packages ===", broken))
 
     lines.append("\n=== summary ===")
     if summary_issues:
-        lines.extend([f"- {x}" for x in summary_issues])
+        lines.extend(f"- {x}" for x in summary_issues)
     else:
         lines.append("No major issues detected.")
 
@@ -1027,7 +1540,9 @@ def deep_debug(args: argparse.Namespace) -> int:
 
 
 def yay_install(args: argparse.Namespace) -> int:
-    if os.geteuid() == 0:
+    import tempfile
+
+    if _EUID == 0:
         print("Do not run yay-install as root.")
         return 1
     if _require_cmd("pacman") or _require_cmd("git"):
@@ -1062,202 +1577,143 @@ def _add_yes(p: argparse.ArgumentParser) -> None:
     p.add_argument("--yes", action="store_true", help="Assume yes for prompts")
 
 
-def build_parser() -> argparse.ArgumentParser:
-    p = argparse.ArgumentParser(prog="arch_essentials_converted", description="Python conversion of Arch-Essentials shell scripts")
-    sub = p.add_subparsers(dest="command", required=True)
-
+_SUBCOMMANDS: list[tuple[str, Callable[[argparse.Namespace], int], list[tuple[str, dict[str, Any]]], bool]] = [
     # Existing
-    x = sub.add_parser("check-logs")
-    x.add_argument("--report")
-    x.add_argument("--lines", type=int, default=50)
-    x.set_defaults(func=check_logs)
-
-    x = sub.add_parser("clean-pacman-cache")
-    x.set_defaults(func=clean_pacman_cache_simple)
-
-    x = sub.add_parser("clear-pacman-cache")
-    x.add_argument("--keep", type=int, default=2)
-    x.add_argument("--report")
-    _add_yes(x)
-    x.set_defaults(func=clear_pacman_cache)
-
-    x = sub.add_parser("clear-system-logs")
-    x.add_argument("--vacuum-time", default="7d")
-    x.add_argument("--report")
-    _add_yes(x)
-    x.set_defaults(func=clear_system_logs)
-
-    x = sub.add_parser("clear-temp-files")
-    x.add_argument("--report")
-    _add_yes(x)
-    x.set_defaults(func=clear_temp_files)
-
-    x = sub.add_parser("deep-clean")
-    x.add_argument("--vacuum-time", default="7d")
-    x.add_argument("--keep", type=int, default=2)
-    x.add_argument("--clear-user-cache", action="store_true")
-    x.add_argument("--remove-old-kernels", action="store_true")
-    _add_yes(x)
-    x.set_defaults(func=deep_clean)
-
-    x = sub.add_parser("find-broken-packages")
-    x.add_argument("--report")
-    x.add_argument("--reinstall", action="store_true")
-    _add_yes(x)
-    x.set_defaults(func=find_broken_packages)
-
-    x = sub.add_parser("list-orphaned-packages")
-    x.set_defaults(func=list_orphaned_packages)
-
-    x = sub.add_parser("remove-orphaned-packages")
-    x.add_argument("--report")
-    _add_yes(x)
-    x.set_defaults(func=remove_orphaned_packages)
-
-    x = sub.add_parser("list-installed-packages")
-    x.add_argument("--verbose", action="store_true")
-    x.set_defaults(func=list_installed_packages)
-
-    x = sub.add_parser("list-system-packages")
-    x.set_defaults(func=list_system_packages)
-
-    x = sub.add_parser("list-aur-packages")
-    x.add_argument("--remove")
-    x.set_defaults(func=list_aur_packages)
-
-    x = sub.add_parser("install-package")
-    x.add_argument("name")
-    x.add_argument("--source", choices=["official", "aur", "search-only"], default="search-only")
-    x.add_argument("--package")
-    x.set_defaults(func=install_package)
-
-    x = sub.add_parser("system-update")
-    x.set_defaults(func=system_update)
-
-    x = sub.add_parser("update")
-    x.set_defaults(func=update)
-
-    x = sub.add_parser("upgrade-packages")
-    x.set_defaults(func=upgrade_packages)
-
-    x = sub.add_parser("test-internet-connection")
-    x.add_argument("--servers", nargs="+", default=["8.8.8.8", "1.1.1.1", "8.8.4.4"])
-    x.add_argument("--count", type=int, default=4)
-    x.set_defaults(func=test_internet_connection)
-
-    x = sub.add_parser("show-ip-address")
-    x.set_defaults(func=show_ip_address)
-
-    x = sub.add_parser("network-speed")
-    x.add_argument("--install-missing", action="store_true")
-    _add_yes(x)
-    x.set_defaults(func=network_speed)
-
-    x = sub.add_parser("network-overview")
-    x.add_argument("--gather-stats", action="store_true")
-    x.add_argument("--stats-file", default="/tmp/network_stats.txt")
-    x.set_defaults(func=network_overview)
-
-    x = sub.add_parser("show-system-specs")
-    x.set_defaults(func=show_system_specs)
-
-    x = sub.add_parser("system-overview")
-    x.set_defaults(func=system_overview)
-
-    x = sub.add_parser("clear-thumbnail-cache")
-    _add_yes(x)
-    x.set_defaults(func=clear_thumbnail_cache)
-
-    x = sub.add_parser("clear-user-cache")
-    _add_yes(x)
-    x.set_defaults(func=clear_user_cache)
-
-    x = sub.add_parser("clear-aur-cache")
-    _add_yes(x)
-    x.set_defaults(func=clear_aur_cache)
-
-    x = sub.add_parser("remove-old-kernels")
-    _add_yes(x)
-    x.set_defaults(func=remove_old_kernels)
-
+    ("check-logs", check_logs, [
+        ("--report", {}),
+        ("--lines", dict(type=int, default=50)),
+    ], False),
+    ("clean-pacman-cache", clean_pacman_cache_simple, [], False),
+    ("clear-pacman-cache", clear_pacman_cache, [
+        ("--keep", dict(type=int, default=2)),
+        ("--report", {}),
+    ], True),
+    ("clear-system-logs", clear_system_logs, [
+        ("--vacuum-time", dict(default="7d")),
+        ("--report", {}),
+    ], True),
+    ("clear-temp-files", clear_temp_files, [
+        ("--report", {}),
+    ], True),
+    ("deep-clean", deep_clean, [
+        ("--vacuum-time", dict(default="7d")),
+        ("--keep", dict(type=int, default=2)),
+        ("--clear-user-cache", dict(action="store_true")),
+        ("--remove-old-kernels", dict(action="store_true")),
+    ], True),
+    ("find-broken-packages", find_broken_packages, [
+        ("--report", {}),
+        ("--reinstall", dict(action="store_true")),
+    ], True),
+    ("list-orphaned-packages", list_orphaned_packages, [], False),
+    ("remove-orphaned-packages", remove_orphaned_packages, [
+        ("--report", {}),
+    ], True),
+    ("list-installed-packages", list_installed_packages, [
+        ("--verbose", dict(action="store_true")),
+    ], False),
+    ("list-system-packages", list_system_packages, [], False),
+    ("list-aur-packages", list_aur_packages, [
+        ("--remove", {}),
+    ], False),
+    ("install-package", install_package, [
+        ("name", {}),
+        ("--source", dict(choices=["official", "aur", "search-only"], default="search-only")),
+        ("--package", {}),
+    ], False),
+    ("system-update", system_update, [], False),
+    ("update", update, [], False),
+    ("upgrade-packages", upgrade_packages, [], False),
+    ("test-internet-connection", test_internet_connection, [
+        ("--servers", dict(nargs="+", default=["8.8.8.8", "1.1.1.1", "8.8.4.4"])),
+        ("--count", dict(type=int, default=4)),
+    ], False),
+    ("show-ip-address", show_ip_address, [], False),
+    ("network-speed", network_speed, [
+        ("--install-missing", dict(action="store_true")),
+    ], True),
+    ("network-overview", network_overview, [
+        ("--gather-stats", dict(action="store_true")),
+        ("--stats-file", dict(default="/tmp/network_stats.txt")),
+    ], False),
+    ("show-system-specs", show_system_specs, [], False),
+    ("system-overview", system_overview, [], False),
+    ("clear-thumbnail-cache", clear_thumbnail_cache, [], True),
+    ("clear-user-cache", clear_user_cache, [], True),
+    ("clear-aur-cache", clear_aur_cache, [], True),
+    ("remove-old-kernels", remove_old_kernels, [], True),
     # Missing conversions added
-    x = sub.add_parser("change-cursor-theme")
-    x.add_argument("--theme")
-    x.add_argument("--list", action="store_true")
-    x.set_defaults(func=change_cursor_theme)
-
-    x = sub.add_parser("change-gtk-theme")
-    x.add_argument("--theme")
-    x.add_argument("--list", action="store_true")
-    x.set_defaults(func=change_gtk_theme)
-
-    x = sub.add_parser("change-icon-theme")
-    x.add_argument("--theme")
-    x.add_argument("--list", action="store_true")
-    x.add_argument("--preview", action="store_true")
-    _add_yes(x)
-    x.set_defaults(func=change_icon_theme)
-
-    x = sub.add_parser("change-grub-theme")
-    x.add_argument("--theme")
-    x.add_argument("--list", action="store_true")
-    _add_yes(x)
-    x.set_defaults(func=change_grub_theme)
-
-    x = sub.add_parser("change-plymouth-theme")
-    x.add_argument("--theme")
-    x.add_argument("--list", action="store_true")
-    _add_yes(x)
-    x.set_defaults(func=change_plymouth_theme)
-
-    x = sub.add_parser("customize-terminal-colors")
-    x.add_argument("--scheme")
-    x.add_argument("--list", action="store_true")
-    x.set_defaults(func=customize_terminal_colors)
-
-    x = sub.add_parser("install-fonts")
-    x.add_argument("--font")
-    x.add_argument("--list", action="store_true")
-    x.set_defaults(func=install_fonts)
-
-    x = sub.add_parser("manage-startup-apps")
-    x.add_argument("--action", choices=["list", "add", "remove", "toggle"], default="list")
-    x.add_argument("--name")
-    x.add_argument("--exec-cmd")
-    x.add_argument("--comment")
-    x.set_defaults(func=manage_startup_apps)
-
-    x = sub.add_parser("manage-system-sounds")
-    x.add_argument("--action", choices=["enable", "mute", "customize-startup"], default="enable")
-    x.add_argument("--sound-file")
-    x.set_defaults(func=manage_system_sounds)
-
-    x = sub.add_parser("set-dynamic-wallpaper")
-    x.add_argument("--install", action="store_true")
-    x.add_argument("--enable-auto", action="store_true")
-    x.add_argument("--status", action="store_true")
-    x.add_argument("--apply-wallpaper")
-    _add_yes(x)
-    x.set_defaults(func=set_dynamic_wallpaper)
-
-    x = sub.add_parser("deep-debug")
-    x.add_argument("--report")
-    x.set_defaults(func=deep_debug)
-
-    x = sub.add_parser("yay-install")
-    _add_yes(x)
-    x.set_defaults(func=yay_install)
-
-    x = sub.add_parser("menu")
-    x.set_defaults(func=arch_menu)
+    ("change-cursor-theme", change_cursor_theme, [
+        ("--theme", {}),
+        ("--list", dict(action="store_true")),
+    ], False),
+    ("change-gtk-theme", change_gtk_theme, [
+        ("--theme", {}),
+        ("--list", dict(action="store_true")),
+    ], False),
+    ("change-icon-theme", change_icon_theme, [
+        ("--theme", {}),
+        ("--list", dict(action="store_true")),
+        ("--preview", dict(action="store_true")),
+    ], True),
+    ("change-grub-theme", change_grub_theme, [
+        ("--theme", {}),
+        ("--list", dict(action="store_true")),
+    ], True),
+    ("change-plymouth-theme", change_plymouth_theme, [
+        ("--theme", {}),
+        ("--list", dict(action="store_true")),
+    ], True),
+    ("customize-terminal-colors", customize_terminal_colors, [
+        ("--scheme", {}),
+        ("--list", dict(action="store_true")),
+    ], False),
+    ("install-fonts", install_fonts, [
+        ("--font", {}),
+        ("--list", dict(action="store_true")),
+    ], False),
+    ("manage-startup-apps", manage_startup_apps, [
+        ("--action", dict(choices=["list", "add", "remove", "toggle"], default="list")),
+        ("--name", {}),
+        ("--exec-cmd", {}),
+        ("--comment", {}),
+    ], False),
+    ("manage-system-sounds", manage_system_sounds, [
+        ("--action", dict(choices=["enable", "mute", "customize-startup"], default="enable")),
+        ("--sound-file", {}),
+    ], False),
+    ("set-dynamic-wallpaper", set_dynamic_wallpaper, [
+        ("--install", dict(action="store_true")),
+        ("--enable-auto", dict(action="store_true")),
+        ("--status", dict(action="store_true")),
+        ("--apply-wallpaper", {}),
+    ], True),
+    ("deep-debug", deep_debug, [
+        ("--report", {}),
+    ], False),
+    ("yay-install", yay_install, [], True),
+    ("menu", arch_menu, [], False),
+]
 
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="arch_essentials_converted", description="Python conversion of Arch-Essentials shell scripts")
+    sub = p.add_subparsers(dest="command", required=True)
+    for name, func, argspec, add_yes in _SUBCOMMANDS:
+        x = sub.add_parser(name)
+        for flag, kw in argspec:
+            x.add_argument(flag, **kw)
+        if add_yes:
+            _add_yes(x)
+        x.set_defaults(func=func)
     return p
 
 
 def main(argv: list[str] | None = None) -> int:
-    parser = build_parser()
-    args = parser.parse_args(argv)
-    return int(args.func(args))
+    args = build_parser().parse_args(argv)
+    func = args.func
+    rc = func(args)
+    return rc if type(rc) is int else int(rc)
 
 
 if __name__ == "__main__":
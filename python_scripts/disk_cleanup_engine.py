@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 """Core engine for disk analysis, cleanup planning, and cleanup execution.
 
-This module is intentionally standalone and standard-library only.
+This module is intentionally standalone and standard-library only; the
+``blake3`` and ``orjson`` packages are used for hashing and JSON I/O when
+installed.
 It provides:
 - High-volume file scanning with exclusion controls
 - Detailed storage analysis and duplicate detection
@@ -11,11 +13,19 @@ It provides:
 
 from __future__ import annotations
 
+import bisect
+import concurrent.futures
 import datetime as dt
+import filecmp
 import fnmatch
+import functools
 import hashlib
+import heapq
+import itertools
 import json
+import operator
 import os
+import re
 import shutil
 import stat
 from collections import Counter, defaultdict
@@ -23,6 +33,17 @@ from dataclasses import asdict, dataclass, field
 from pathlib import Path
 from typing import Any, Iterable, Iterator, Sequence
 
+try:
+    from blake3 import blake3 as _content_hasher
+except ImportError:
+    _content_hasher = hashlib.sha256
+
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+_HAVE_FADVISE = hasattr(os, "posix_fadvise")
 
 DEFAULT_EXCLUDE_DIR_NAMES = {
     ".git",
@@ -81,6 +102,13 @@ CACHE_DIR_HINTS = {
     "temp",
 }
 
+# Any path component (directory or file name) equal to a cache hint.
+_CACHE_HINT_RE = re.compile(
+    r"(?:^|{sep})(?:{hints})(?:{sep}|$)".format(
+        sep=re.escape(os.sep), hints="|".join(map(re.escape, sorted(CACHE_DIR_HINTS)))
+    )
+)
+
 PROTECTED_ABSOLUTE_PATHS = {
     "/",
     "/bin",
@@ -99,8 +127,24 @@ PROTECTED_ABSOLUTE_PATHS = {
     "/var",
 }
 
+BYTE_UNITS = ("B", "KB", "MB", "GB", "TB", "PB")
 
-@dataclass
+# Size of the head-only prefilter read before the head+tail quick hash.
+HEAD_HASH_BYTES = 4096
+
+# Upper bound (inclusive, in days) of each age bucket; the last bucket is open-ended.
+AGE_BUCKET_EDGES = (7, 30, 90, 180, 365)
+AGE_BUCKET_KEYS = (
+    "0_7_days",
+    "8_30_days",
+    "31_90_days",
+    "91_180_days",
+    "181_365_days",
+    "366_plus_days",
+)
+
+
+@dataclass(slots=True)
 class FileRecord:
     """Metadata for one discovered file."""
 
@@ -136,6 +180,8 @@ class AnalyzerConfig:
     include_duplicates: bool = True
     quick_hash_bytes: int = 1024 * 1024
     max_duplicate_candidates: int = 200_000
+    scan_workers: int = 0  # 0 = auto; use 1 on local disks where parallel seeks hurt
+    hash_workers: int = 0  # 0 = CPU count
 
 
 @dataclass
@@ -221,16 +267,15 @@ def parse_bytes_human(value: str) -> int:
     return int(float(text))
 
 
+@functools.lru_cache(maxsize=8192)
 def format_bytes(value: int) -> str:
     """Human-readable bytes using binary units."""
-    num = float(max(0, value))
-    for unit in ["B", "KB", "MB", "GB", "TB", "PB"]:
-        if num < 1024.0 or unit == "PB":
-            if unit == "B":
-                return f"{int(num)} {unit}"
-            return f"{num:.2f} {unit}"
-        num /= 1024.0
-    return f"{int(value)} B"
+    value = max(0, int(value))
+    if value < 1024:
+        return f"{value} B"
+    # Each unit is 2**10 of the previous one, so the bit length picks it directly.
+    k = min(len(BYTE_UNITS) - 1, (value.bit_length() - 1) // 10)
+    return f"{value / (1 << (10 * k)):.2f} {BYTE_UNITS[k]}"
 
 
 def age_days(epoch_seconds: float, now: float | None = None) -> int:
@@ -243,11 +288,81 @@ def age_days(epoch_seconds: float, now: float | None = None) -> int:
 def write_json(path: str | Path, data: Any) -> None:
     out = Path(path)
     out.parent.mkdir(parents=True, exist_ok=True)
+    if _orjson is not None:
+        try:
+            out.write_bytes(_orjson.dumps(data, option=_orjson.OPT_INDENT_2))
+            return
+        except TypeError:
+            # e.g. surrogate-escaped (non UTF-8) file names; the stdlib encoder escapes them.
+            pass
     out.write_text(json.dumps(data, indent=2, ensure_ascii=True), encoding="utf-8")
 
 
 def read_json(path: str | Path) -> Any:
-    return json.loads(Path(path).read_text(encoding="utf-8"))
+    raw = Path(path).read_bytes()
+    if _orjson is not None:
+        try:
+            return _orjson.loads(raw)
+        except ValueError:
+            # orjson rejects the escaped lone surrogates write_json falls back to.
+            pass
+    return json.loads(raw.decode("utf-8"))
+
+
+def _keep_top(heap: list[Any], limit: int, entry: tuple[Any, ...]) -> None:
+    if len(heap) < limit:
+        heapq.heappush(heap, entry)
+    elif limit and entry > heap[0]:
+        heapq.heapreplace(heap, entry)
+
+
+class _SizeBuckets:
+    """Paths grouped by file size, with same-size candidates capped as they arrive.
+
+    Once the candidate count passes twice the cap, the smallest groups are evicted
+    and later files of those sizes are ignored, so memory stays bounded.
+    """
+
+    __slots__ = ("cap", "candidates", "evicted", "paths")
+
+    def __init__(self, cap: int) -> None:
+        self.cap = cap
+        self.candidates = 0
+        self.evicted: set[int] = set()
+        self.paths: dict[int, list[str]] = {}
+
+    def add(self, size: int, path: str) -> None:
+        group = self.paths.get(size)
+        if group is None:
+            if size not in self.evicted:
+                self.paths[size] = [path]
+            return
+        group.append(path)
+        self.candidates += 2 if len(group) == 2 else 1
+        if self.candidates > 2 * self.cap:
+            self.trim()
+
+    def trim(self) -> None:
+        groups = sorted(
+            ((size, group) for size, group in self.paths.items() if len(group) > 1),
+            key=lambda kv: (len(kv[1]), kv[0]),
+            reverse=True,
+        )
+        kept = 0
+        full = False
+        for size, group in groups:
+            if full or kept + len(group) > self.cap:
+                full = True
+                del self.paths[size]
+                self.evicted.add(size)
+            else:
+                kept += len(group)
+        self.candidates = kept
+
+    def groups(self) -> list[tuple[int, list[str]]]:
+        if self.candidates > self.cap:
+            self.trim()
+        return [(size, group) for size, group in self.paths.items() if len(group) > 1]
 
 
 class DiskAnalyzer:
@@ -256,36 +371,75 @@ class DiskAnalyzer:
     def __init__(self, config: AnalyzerConfig):
         self.config = config
         self.errors: list[ScanError] = []
-        self._dir_sizes: Counter[str] = Counter()
+        self._dir_sizes: defaultdict[str, int] = defaultdict(int)
+        self._exclude_re = self._compile_globs(config.exclude_globs)
 
     def scan(self) -> list[FileRecord]:
-        records: list[FileRecord] = []
+        return list(self.scan_iter())
+
+    def scan_iter(self) -> Iterator[FileRecord]:
+        """Yield records as they are found; errors and directory sizes fill in as it runs."""
         self.errors = []
-        self._dir_sizes = Counter()
+        self._dir_sizes = defaultdict(int)
+        self._exclude_re = self._compile_globs(self.config.exclude_globs)
 
         roots = [self._normalize_root(r) for r in self.config.roots]
         roots = [r for r in roots if r.exists() and r.is_dir()]
 
         for root in roots:
-            for rec in self._scan_root(root):
-                records.append(rec)
-
-        return records
+            yield from self._scan_root(root)
 
-    def build_report(self, records: Sequence[FileRecord]) -> dict[str, Any]:
+    def build_report(self, records: Iterable[FileRecord]) -> dict[str, Any]:
+        """Summarize records in a single pass; accepts a list or scan_iter() directly."""
         now_ts = dt.datetime.now().timestamp()
-        total_files = len(records)
-        total_bytes = sum(r.size for r in records)
+        top_n = self.config.top_n
+        total_files = 0
+        total_bytes = 0
+        hidden_files = 0
+        bucket_counts = [0] * len(AGE_BUCKET_KEYS)
+        stale_cutoff = self.config.stale_days
+        # Bounded min-heaps of (size, path, ...). Ranking on path rather than arrival order
+        # keeps ties stable when the scan runs on a thread pool.
+        largest: list[tuple[int, str, FileRecord]] = []
+        stale: list[tuple[int, str, FileRecord, int]] = []
+        by_size = (
+            _SizeBuckets(self.config.max_duplicate_candidates)
+            if self.config.include_duplicates
+            else None
+        )
 
         by_extension = Counter()
         by_extension_bytes = Counter()
         for rec in records:
+            total_files += 1
+            size = rec.size
+            _keep_top(largest, top_n, (size, rec.path, rec))
+            if by_size is not None and size > 0:
+                by_size.add(size, rec.path)
+            total_bytes += size
+            if rec.is_hidden:
+                hidden_files += 1
+
             ext = rec.extension or "(no_ext)"
             by_extension[ext] += 1
-            by_extension_bytes[ext] += rec.size
+            by_extension_bytes[ext] += size
+
+            # Inlined age_days(): this loop runs once per scanned file.
+            mtime = rec.mtime
+            days = max(0, int((now_ts - mtime) // 86400)) if mtime > 0 else 0
+            bucket_counts[bisect.bisect_left(AGE_BUCKET_EDGES, days)] += 1
+
+            atime = rec.atime
+            days = max(0, int((now_ts - atime) // 86400)) if atime > 0 else 0
+            if days >= stale_cutoff:
+                _keep_top(stale, top_n, (size, rec.path, rec, days))
+
+        age_buckets = dict(zip(AGE_BUCKET_KEYS, bucket_counts))
 
         top_extensions = []
-        for ext, count in by_extension.most_common(self.config.top_n):
+        for ext, count in heapq.nsmallest(
+            self.config.top_n, by_extension.items(), key=lambda kv: (-kv[1], kv[0])
+        ):
             top_extensions.append(
                 {
                     "extension": ext,
@@ -295,30 +449,6 @@ class DiskAnalyzer:
                 }
             )
 
-        age_buckets = {
-            "0_7_days": 0,
-            "8_30_days": 0,
-            "31_90_days": 0,
-            "91_180_days": 0,
-            "181_365_days": 0,
-            "366_plus_days": 0,
-        }
-
-        for rec in records:
-            days = age_days(rec.mtime, now_ts)
-            if days <= 7:
-                age_buckets["0_7_days"] += 1
-            elif days <= 30:
-                age_buckets["8_30_days"] += 1
-            elif days <= 90:
-                age_buckets["31_90_days"] += 1
-            elif days <= 180:
-                age_buckets["91_180_days"] += 1
-            elif days <= 365:
-                age_buckets["181_365_days"] += 1
-            else:
-                age_buckets["366_plus_days"] += 1
-
         largest_files = [
             {
                 "path": r.path,
@@ -327,21 +457,18 @@ class DiskAnalyzer:
                 "mtime": dt.datetime.fromtimestamp(r.mtime).isoformat(),
                 "atime": dt.datetime.fromtimestamp(r.atime).isoformat(),
             }
-            for r in sorted(records, key=lambda x: x.size, reverse=True)[: self.config.top_n]
+            for _, _, r in sorted(largest, reverse=True)
         ]
 
-        stale_cutoff = self.config.stale_days
         stale_files = [
             {
                 "path": r.path,
                 "size": r.size,
                 "size_human": format_bytes(r.size),
-                "days_since_access": age_days(r.atime, now_ts),
+                "days_since_access": days,
             }
-            for r in records
-            if age_days(r.atime, now_ts) >= stale_cutoff
+            for _, _, r, days in sorted(stale, reverse=True)
         ]
-        stale_files.sort(key=lambda x: x["size"], reverse=True)
 
         dir_summary = [
             {
@@ -349,19 +476,17 @@ class DiskAnalyzer:
                 "bytes": size,
                 "bytes_human": format_bytes(size),
             }
-            for path, size in self._dir_sizes.most_common(self.config.top_n)
+            for path, size in heapq.nsmallest(
+                self.config.top_n, self._dir_sizes.items(), key=lambda kv: (-kv[1], kv[0])
+            )
         ]
 
         duplicate_groups: list[dict[str, Any]] = []
         duplicate_file_count = 0
         duplicate_waste_bytes = 0
 
-        if self.config.include_duplicates:
-            groups = self.find_duplicate_groups(records)
-            for group in groups:
-                if len(group) <= 1:
-                    continue
-                size = group[0].size
+        if by_size is not None:
+            for size, group in self._confirm_duplicates(by_size):
                 duplicate_file_count += len(group)
                 duplicate_waste_bytes += size * (len(group) - 1)
                 duplicate_groups.append(
@@ -371,7 +496,7 @@ class DiskAnalyzer:
                         "size_each_human": format_bytes(size),
                         "potential_waste_bytes": size * (len(group) - 1),
                         "potential_waste_human": format_bytes(size * (len(group) - 1)),
-                        "paths": [g.path for g in group],
+                        "paths": group,
                     }
                 )
 
@@ -392,14 +517,14 @@ class DiskAnalyzer:
                 "total_files": total_files,
                 "total_bytes": total_bytes,
                 "total_human": format_bytes(total_bytes),
-                "hidden_files": sum(1 for r in records if r.is_hidden),
+                "hidden_files": hidden_files,
                 "scan_errors": len(self.errors),
             },
             "age_buckets": age_buckets,
             "top_extensions": top_extensions,
             "top_directories": dir_summary,
             "largest_files": largest_files,
-            "stale_files_top": stale_files[: self.config.top_n],
+            "stale_files_top": stale_files,
             "duplicates": {
                 "group_count": len(duplicate_groups),
                 "files_in_groups": duplicate_file_count,
@@ -407,7 +532,12 @@ class DiskAnalyzer:
                 "potential_waste_human": format_bytes(duplicate_waste_bytes),
                 "groups": duplicate_groups[: self.config.top_n],
             },
-            "errors": [asdict(e) for e in self.errors[: self.config.top_n * 2]],
+            "errors": [
+                asdict(e)
+                for e in heapq.nsmallest(
+                    self.config.top_n * 2, self.errors, key=operator.attrgetter("path")
+                )
+            ],
         }
         return report
 
@@ -465,134 +595,239 @@ class DiskAnalyzer:
 
         return "\n".join(lines)
 
-    def find_duplicate_groups(self, records: Sequence[FileRecord]) -> list[list[FileRecord]]:
-        by_size: dict[int, list[FileRecord]] = defaultdict(list)
+    def find_duplicate_groups(self, records: Iterable[FileRecord]) -> list[list[FileRecord]]:
+        by_size = _SizeBuckets(self.config.max_duplicate_candidates)
+        by_path: dict[str, FileRecord] = {}
         for rec in records:
             if rec.size <= 0:
                 continue
-            by_size[rec.size].append(rec)
-
-        size_candidates = [group for group in by_size.values() if len(group) > 1]
-        candidate_count = sum(len(g) for g in size_candidates)
-        if candidate_count > self.config.max_duplicate_candidates:
-            size_candidates = sorted(size_candidates, key=len, reverse=True)
-            trimmed: list[list[FileRecord]] = []
-            seen = 0
-            for group in size_candidates:
-                if seen + len(group) > self.config.max_duplicate_candidates:
-                    break
-                trimmed.append(group)
-                seen += len(group)
-            size_candidates = trimmed
-
-        quick_hash_groups: dict[tuple[int, str], list[FileRecord]] = defaultdict(list)
-        for group in size_candidates:
-            for rec in group:
-                qh = self._quick_hash(Path(rec.path), self.config.quick_hash_bytes)
+            by_size.add(rec.size, rec.path)
+            by_path[rec.path] = rec
+        return [[by_path[p] for p in group] for _, group in self._confirm_duplicates(by_size)]
+
+    def _confirm_duplicates(self, by_size: _SizeBuckets) -> list[tuple[int, list[str]]]:
+        """Return (size, sorted paths) for each group of byte-identical files."""
+        # Hashing releases the GIL (hashlib above 2 KiB, blake3 always), so threads scale.
+        workers = self.config.hash_workers or (os.cpu_count() or 1)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as ex:
+            chunk_size = self.config.quick_hash_bytes
+            small_limit = chunk_size * 2
+
+            def first_pass(item: tuple[int, str]) -> str | None:
+                size, path = item
+                # Small files would be read whole again by the full hash, so hash them fully now.
+                if size <= small_limit:
+                    return self._full_hash(Path(path), size)
+                return self._quick_hash(Path(path), size, chunk_size)
+
+            candidates = [(size, path) for size, group in by_size.groups() for path in group]
+
+            # Cheap first filter for larger files: one pread of the first block. Most
+            # same-size files already differ there and never reach the head+tail hash.
+            large = [path for size, path in candidates if size > small_limit]
+            heads = dict(zip(large, ex.map(self._head_hash, large)))
+            head_groups = Counter(
+                (size, head)
+                for size, path in candidates
+                if size > small_limit and (head := heads[path]) is not None
+            )
+            candidates = [
+                (size, path)
+                for size, path in candidates
+                if size <= small_limit or head_groups[(size, heads[path])] > 1
+            ]
+            quick_hashes = ex.map(first_pass, candidates)
+
+            quick_hash_groups: dict[tuple[int, str], list[str]] = defaultdict(list)
+            for (size, path), qh in zip(candidates, quick_hashes):
                 if not qh:
                     continue
-                quick_hash_groups[(rec.size, qh)].append(rec)
-
-        full_hash_groups: dict[str, list[FileRecord]] = defaultdict(list)
-        for (_, _), group in quick_hash_groups.items():
-            if len(group) < 2:
-                continue
-            for rec in group:
-                fh = self._full_hash(Path(rec.path))
+                quick_hash_groups[(size, qh)].append(path)
+
+            # Byte-compare pairs: stops at the first mismatch and reads each file once.
+            confirmed: list[tuple[int, list[str]]] = []
+            pair_groups: list[tuple[int, list[str]]] = []
+            to_hash: list[tuple[int, str]] = []
+            for (size, _), group in quick_hash_groups.items():
+                if len(group) < 2:
+                    continue
+                if size <= small_limit:
+                    confirmed.append((size, group))
+                elif len(group) == 2:
+                    pair_groups.append((size, group))
+                else:
+                    to_hash.extend((size, path) for path in group)
+            same = ex.map(lambda g: self._same_content(*g[1]), pair_groups)
+            full_hashes = ex.map(lambda item: self._full_hash(Path(item[1]), item[0]), to_hash)
+
+            pairs = [group for group, ok in zip(pair_groups, same) if ok]
+            full_hash_groups: dict[str, list[str]] = defaultdict(list)
+            sizes: dict[str, int] = {}
+            for (size, path), fh in zip(to_hash, full_hashes):
                 if not fh:
                     continue
-                full_hash_groups[fh].append(rec)
+                full_hash_groups[fh].append(path)
+                sizes[fh] = size
+        # filecmp memoizes every compared pair in a module-level dict that never shrinks.
+        filecmp.clear_cache()
 
         duplicates = [
-            sorted(group, key=lambda r: r.path)
-            for group in full_hash_groups.values()
+            (size, sorted(group))
+            for size, group in itertools.chain(
+                ((sizes[fh], group) for fh, group in full_hash_groups.items()), pairs, confirmed
+            )
             if len(group) > 1
         ]
-        duplicates.sort(key=lambda g: (g[0].size, len(g)), reverse=True)
+        duplicates.sort(key=lambda g: (-g[0], -len(g[1]), g[1][0]))
         return duplicates
 
     def _scan_root(self, root: Path) -> Iterator[FileRecord]:
-        stack = [root]
-        while stack:
-            current = stack.pop()
-
-            if self._is_excluded(current):
-                continue
-
-            try:
-                with os.scandir(current) as it:
-                    for entry in it:
-                        entry_path = Path(entry.path)
-
-                        if self._is_excluded(entry_path):
-                            continue
-
-                        try:
-                            is_dir = entry.is_dir(follow_symlinks=self.config.follow_symlinks)
-                            is_file = entry.is_file(follow_symlinks=self.config.follow_symlinks)
-                        except (PermissionError, FileNotFoundError, OSError) as exc:
-                            self.errors.append(ScanError(path=str(entry_path), error=str(exc)))
-                            continue
+        workers = self.config.scan_workers or min(32, (os.cpu_count() or 1) * 2)
+        if workers <= 1:
+            stack = [str(root)]
+            while stack:
+                records, subdirs, errors = self._scan_dir(stack.pop())
+                self.errors.extend(errors)
+                stack.extend(subdirs)
+                yield from self._account(records)
+            return
 
-                        if is_dir:
-                            if not self.config.include_hidden and entry.name.startswith("."):
-                                continue
-                            if entry.name in self.config.exclude_dir_names:
-                                continue
-                            stack.append(entry_path)
-                            continue
+        # Each task lists one directory; overlapping scandir/stat latency pays off on
+        # network filesystems. Results are merged here so no shared state is locked.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as ex:
+            pending = {ex.submit(self._scan_dir, str(root))}
+            while pending:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for fut in done:
+                    records, subdirs, errors = fut.result()
+                    self.errors.extend(errors)
+                    pending.update(ex.submit(self._scan_dir, d) for d in subdirs)
+                    yield from self._account(records)
+
+    def _account(self, records: list[FileRecord]) -> list[FileRecord]:
+        if records:
+            self._dir_sizes[os.path.dirname(records[0].path)] += sum(r.size for r in records)
+        return records
 
-                        if not is_file:
-                            continue
+    def _scan_dir(self, current: str) -> tuple[list[FileRecord], list[str], list[ScanError]]:
+        records: list[FileRecord] = []
+        subdirs: list[str] = []
+        errors: list[ScanError] = []
 
-                        if not self.config.include_hidden and entry.name.startswith("."):
-                            continue
+        if self._is_excluded(current):
+            return records, subdirs, errors
 
-                        try:
-                            st = entry.stat(follow_symlinks=self.config.follow_symlinks)
-                        except (PermissionError, FileNotFoundError, OSError) as exc:
-                            self.errors.append(ScanError(path=str(entry_path), error=str(exc)))
+        follow = self.config.follow_symlinks
+        include_hidden = self.config.include_hidden
+        exclude_dir_names = self.config.exclude_dir_names
+        min_size = self.config.min_file_size_bytes
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    p = entry.path
+                    name = entry.name
+
+                    if self._matches_exclude_glob(p):
+                        continue
+
+                    # is_dir() is answered from d_type when available; files then need
+                    # exactly one (cached) stat, which also tells regular files apart.
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=follow)
+                    except (PermissionError, FileNotFoundError, OSError) as exc:
+                        errors.append(ScanError(path=p, error=str(exc)))
+                        continue
+
+                    is_hidden = name[0] == "."
+                    if is_dir:
+                        if not include_hidden and is_hidden:
                             continue
-
-                        if stat.S_ISLNK(st.st_mode) and not self.config.follow_symlinks:
+                        if name in exclude_dir_names:
                             continue
-
-                        if st.st_size < self.config.min_file_size_bytes:
-                            continue
-
-                        parent = str(entry_path.parent)
-                        self._dir_sizes[parent] += st.st_size
-
-                        yield FileRecord(
-                            path=str(entry_path),
+                        subdirs.append(p)
+                        continue
+
+                    if not include_hidden and is_hidden:
+                        continue
+
+                    try:
+                        st = entry.stat(follow_symlinks=follow)
+                    except FileNotFoundError as exc:
+                        if not entry.is_symlink():  # dangling links are skipped quietly
+                            errors.append(ScanError(path=p, error=str(exc)))
+                        continue
+                    except (PermissionError, OSError) as exc:
+                        errors.append(ScanError(path=p, error=str(exc)))
+                        continue
+
+                    if not stat.S_ISREG(st.st_mode):
+                        continue
+
+                    if st.st_size < min_size:
+                        continue
+
+                    # Same rule as PurePath.suffix, without building a Path per entry.
+                    dot = name.rfind(".")
+                    records.append(
+                        FileRecord(
+                            path=p,
                             size=int(st.st_size),
                             mtime=float(st.st_mtime),
                             atime=float(st.st_atime),
-                            extension=entry_path.suffix.lower(),
-                            name=entry_path.name,
-                            is_hidden=entry_path.name.startswith("."),
+                            extension=name[dot:].lower() if 0 < dot < len(name) - 1 else "",
+                            name=name,
+                            is_hidden=is_hidden,
                         )
-            except (PermissionError, FileNotFoundError, OSError) as exc:
-                self.errors.append(ScanError(path=str(current), error=str(exc)))
-
-    def _is_excluded(self, path: Path) -> bool:
-        p = str(path)
-        for pattern in self.config.exclude_globs:
-            if fnmatch.fnmatch(p, pattern):
-                return True
-        if path.name in self.config.exclude_dir_names and path.is_dir():
+                    )
+        except (PermissionError, FileNotFoundError, OSError) as exc:
+            errors.append(ScanError(path=str(current), error=str(exc)))
+        return records, subdirs, errors
+
+    def _is_excluded(self, path: str) -> bool:
+        if self._matches_exclude_glob(path):
+            return True
+        if os.path.basename(path) in self.config.exclude_dir_names and os.path.isdir(path):
             return True
         return False
 
+    def _matches_exclude_glob(self, path: str) -> bool:
+        return self._exclude_re is not None and self._exclude_re.match(path) is not None
+
+    @staticmethod
+    def _compile_globs(patterns: Iterable[str]) -> re.Pattern[str] | None:
+        patterns = list(patterns)
+        if not patterns:
+            return None
+        return re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in patterns))
+
     @staticmethod
     def _normalize_root(path: str) -> Path:
         return Path(path).expanduser().resolve()
 
     @staticmethod
-    def _quick_hash(path: Path, chunk_size: int) -> str | None:
+    def _same_content(a: str, b: str) -> bool:
+        try:
+            return filecmp.cmp(a, b, shallow=False)
+        except (PermissionError, FileNotFoundError, OSError):
+            return False
+
+    @staticmethod
+    def _head_hash(path: str) -> int | None:
         try:
-            size = path.stat().st_size
-            hasher = hashlib.sha256()
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                return hash(os.pread(fd, HEAD_HASH_BYTES, 0))
+            finally:
+                os.close(fd)
+        except (PermissionError, FileNotFoundError, OSError):
+            return None
+
+    @staticmethod
+    def _quick_hash(path: Path, size: int, chunk_size: int) -> str | None:
+        try:
+            hasher = _content_hasher()
             with path.open("rb") as fh:
                 first = fh.read(chunk_size)
                 hasher.update(first)
@@ -604,17 +839,27 @@ class DiskAnalyzer:
             return None
 
     @staticmethod
-    def _full_hash(path: Path, block_size: int = 1024 * 1024) -> str | None:
+    def _full_hash(path: Path, size: int, block_size: int = 1024 * 1024) -> str | None:
         try:
-            hasher = hashlib.sha256()
-            with path.open("rb") as fh:
-                while True:
-                    chunk = fh.read(block_size)
-                    if not chunk:
-                        break
-                    hasher.update(chunk)
+            hasher = _content_hasher()
+            # Unbuffered readinto() into one reused buffer: a read(2) per block and no
+            # per-block bytes objects. Not mmap: a file truncated mid-hash (copytruncate
+            # log rotation) would raise SIGBUS instead of just ending the loop early.
+            buf = bytearray(min(block_size, max(size, 1)))
+            view = memoryview(buf)
+            with path.open("rb", buffering=0) as fh:
+                fd = fh.fileno()
+                if _HAVE_FADVISE:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                try:
+                    while n := fh.readinto(buf):
+                        hasher.update(view[:n])
+                finally:
+                    # Read-once data: don't let a large dedup pass evict the page cache.
+                    if _HAVE_FADVISE:
+                        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
             return hasher.hexdigest()
-        except (PermissionError, FileNotFoundError, OSError):
+        except (PermissionError, FileNotFoundError, OSError, ValueError):
             return None
 
 
@@ -630,43 +875,54 @@ class CleanupPlanner:
         actions: list[CleanupAction] = []
         seen_paths: set[str] = set()
 
-        for rec in records:
-            path_obj = Path(rec.path)
+        policy = self.policy
+        temp_min_age = policy.temp_min_age_days
+        log_min_age = policy.log_min_age_days
+        stale_min_age = policy.stale_min_age_days
+        stale_min_size = policy.stale_min_size_bytes
+        max_actions = policy.max_actions
+        temp_reason = f"Temporary file older than {temp_min_age} days"
+        log_reason = f"Log file older than {log_min_age} days"
+        stale_reason = (
+            f"Large stale file (>{format_bytes(stale_min_size)} and "
+            f"unused for {stale_min_age}+ days)"
+        )
+        add = self._add_action
+
+        # The scan pool yields records in completion order; walk them by path so the
+        # max_actions cut keeps the same actions on every run over the same tree.
+        for rec in sorted(records, key=operator.attrgetter("path")):
             ext = rec.extension.lower()
-            name_l = rec.name.lower()
-            parent_names = {p.lower() for p in path_obj.parts}
-            modified_days = age_days(rec.mtime, now_ts)
-            access_days = age_days(rec.atime, now_ts)
+            mtime = rec.mtime
+            modified_days = max(0, int((now_ts - mtime) // 86400)) if mtime > 0 else 0
 
             # Temporary artifacts
-            if ext in TEMP_EXTENSIONS and modified_days >= self.policy.temp_min_age_days:
-                self._add_action(
+            if ext in TEMP_EXTENSIONS and modified_days >= temp_min_age:
+                add(
                     actions,
                     seen_paths,
                     rec,
-                    reason=(
-                        f"Temporary file older than {self.policy.temp_min_age_days} days"
-                    ),
+                    reason=temp_reason,
                     category="temp_files",
                     confidence="high",
                 )
                 continue
 
             # Log artifacts
-            if ext in LOG_EXTENSIONS and modified_days >= self.policy.log_min_age_days:
-                self._add_action(
+            if ext in LOG_EXTENSIONS and modified_days >= log_min_age:
+                add(
                     actions,
                     seen_paths,
                     rec,
-                    reason=f"Log file older than {self.policy.log_min_age_days} days",
+                    reason=log_reason,
                     category="old_logs",
                     confidence="high",
                 )
                 continue
 
             # Known noisy files
-            if name_l in NOISE_FILENAMES:
-                self._add_action(
+            if rec.name.lower() in NOISE_FILENAMES:
+                add(
                     actions,
                     seen_paths,
                     rec,
@@ -677,8 +933,8 @@ class CleanupPlanner:
                 continue
 
             # Files under cache/tmp-like directories
-            if parent_names.intersection(CACHE_DIR_HINTS) and modified_days >= self.policy.temp_min_age_days:
-                self._add_action(
+            if modified_days >= temp_min_age and _CACHE_HINT_RE.search(rec.path.lower()):
+                add(
                     actions,
                     seen_paths,
                     rec,
@@ -689,23 +945,20 @@ class CleanupPlanner:
                 continue
 
             # Very old, very large files with no recent access
-            if (
-                rec.size >= self.policy.stale_min_size_bytes
-                and access_days >= self.policy.stale_min_age_days
-            ):
-                self._add_action(
-                    actions,
-                    seen_paths,
-                    rec,
-                    reason=(
-                        f"Large stale file (>{format_bytes(self.policy.stale_min_size_bytes)} and "
-                        f"unused for {self.policy.stale_min_age_days}+ days)"
-                    ),
-                    category="stale_large_files",
-                    confidence="medium",
-                )
-
-            if len(actions) >= self.policy.max_actions:
+            if rec.size >= stale_min_size:
+                atime = rec.atime
+                access_days = max(0, int((now_ts - atime) // 86400)) if atime > 0 else 0
+                if access_days >= stale_min_age:
+                    add(
+                        actions,
+                        seen_paths,
+                        rec,
+                        reason=stale_reason,
+                        category="stale_large_files",
+                        confidence="medium",
+                    )
+
+            if len(actions) >= max_actions:
                 break
 
         if self.policy.include_empty_dirs and len(actions) < self.policy.max_actions:
@@ -757,20 +1010,10 @@ class CleanupPlanner:
         actions: list[CleanupAction],
         seen_paths: set[str],
     ) -> None:
-        root_path = Path(root)
-        if not root_path.exists() or not root_path.is_dir():
+        if not os.path.isdir(root):
             return
 
-        for dirpath, dirnames, filenames in os.walk(root, topdown=False):
-            current = Path(dirpath)
-
-            if current.name in DEFAULT_EXCLUDE_DIR_NAMES:
-                continue
-
-            if dirnames or filenames:
-                continue
-
-            path_s = str(current)
+        for path_s in _iter_empty_dirs(root, DEFAULT_EXCLUDE_DIR_NAMES):
             if path_s in seen_paths:
                 continue
 
@@ -786,6 +1029,32 @@ class CleanupPlanner:
             )
 
 
+def _iter_empty_dirs(root: str, exclude_names: set[str]) -> Iterator[str]:
+    # Empty directories are leaves, so a depth-first walk that yields them as it lists
+    # them matches os.walk(topdown=False) order. Excluded subtrees are never entered.
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        if os.path.basename(current) in exclude_names:
+            continue
+        try:
+            with os.scandir(current) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        if not entries:
+            yield current
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+            except OSError:
+                pass
+        stack.extend(reversed(subdirs))
+
+
 class CleanupExecutor:
     """Execute a cleanup plan safely with root/path protections."""
 
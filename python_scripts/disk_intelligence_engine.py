@@ -17,6 +17,7 @@ This tool is Linux-focused and optimized for large trees (100k+ files).
 from __future__ import annotations
 
 import argparse
+import array
 import concurrent.futures
 import contextlib
 import dataclasses
@@ -31,14 +32,23 @@ import os
 import re
 import shutil
 import sqlite3
+import stat
 import statistics
 import sys
 import time
 import uuid
-from collections import Counter, defaultdict
+from collections import defaultdict, deque
 from pathlib import Path
 from typing import Any, Iterable, Iterator, Sequence
 
+# Duplicate detection only needs a content fingerprint, not a security boundary: BLAKE3 when
+# installed, otherwise SHA-256 with usedforsecurity=False so FIPS-mode OpenSSL builds don't
+# refuse or slow it.
+try:
+    from blake3 import blake3 as _content_hasher
+except ImportError:
+    _content_hasher = functools.partial(hashlib.sha256, usedforsecurity=False)
+
 # ------------------------------- Constants ---------------------------------- #
 
 APP_NAME = "disk_intel"
@@ -48,8 +58,32 @@ DEFAULT_EXPORT_DIR = Path.cwd() / "disk_intel_reports"
 DEFAULT_LOG_FILE = Path.home() / ".local" / "share" / APP_NAME / "actions.log"
 
 SCAN_BATCH_SIZE = 2000
+PARALLEL_SCAN_MIN_SUBDIRS = 4
 FULL_HASH_BUFFER = 1024 * 1024
 PARTIAL_HASH_BYTES = 64 * 1024
+PARTIAL_HASH_BATCH = 256
+FULL_HASH_BATCH = 32
+SQLITE_CACHE_SIZE = -65536  # negative = KiB, i.e. a 64 MiB page cache
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+SQLITE_BULK_CACHE_SIZE = -262144  # 256 MiB while ingesting and building indexes
+
+# Kept byte-identical across calls so sqlite3's statement cache reuses the prepared statement.
+_INSERT_FILE_SQL = (
+    "INSERT INTO files(snapshot_id, path, dir_path, top_dir, size, extension, mtime, "
+    "permissions, is_hidden, is_symlink, category) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+_FILE_INDEXES = (
+    ("idx_files_snapshot", "snapshot_id"),
+    ("idx_files_size", "snapshot_id, size"),
+    ("idx_files_ext", "snapshot_id, extension"),
+    ("idx_files_category", "snapshot_id, category"),
+    ("idx_files_mtime", "snapshot_id, mtime"),
+    ("idx_files_path", "snapshot_id, path"),
+    ("idx_files_topdir", "snapshot_id, top_dir"),
+    # Covers DuplicateDetector's candidate join, so it never touches the table rows.
+    ("idx_files_dupscan", "snapshot_id, size, path, mtime"),
+)
 
 CRITICAL_DELETE_PATHS = {
     "/",
@@ -84,18 +118,38 @@ DEFAULT_SKIP_NAMES = {
     "node_modules/.cache",
 }
 
+# "/var/tmp/" is covered by "/tmp/".
+_CACHE_SEGMENT_RE = re.compile(r"/(?:cache|tmp)/")
+_SYSTEM_PREFIXES = ("/etc/", "/usr/", "/var/lib/", "/bin/", "/sbin/")
+
+# Resolved once so RiskScorer.assess needs a single realpath (of the candidate) per call.
+_CRITICAL_REAL = frozenset(CRITICAL_DELETE_PATHS | {os.path.realpath(p) for p in CRITICAL_DELETE_PATHS})
+_CRITICAL_PREFIX_TUPLE = tuple(os.path.realpath(p) + os.sep for p in CRITICAL_DELETE_PATHS if p != "/")
+
+# oct() of every permission-bit combination, so the scanner doesn't format one per file.
+_PERMISSION_STRINGS = tuple(oct(mode) for mode in range(0o1000))
+
 
 # ------------------------------- Utilities ---------------------------------- #
 
 
+_last_iso: tuple[int, str] = (-1, "")
+
+
 def now_utc_iso() -> str:
-    return dt.datetime.now(dt.timezone.utc).replace(microsecond=0).isoformat()
+    # Second resolution, so the formatted string is reused until the clock ticks over.
+    global _last_iso
+    sec = int(time.time())
+    if sec != _last_iso[0]:
+        _last_iso = (sec, dt.datetime.fromtimestamp(sec, dt.timezone.utc).isoformat())
+    return _last_iso[1]
 
 
 def ensure_parent(path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
 
 
+@functools.lru_cache(maxsize=8192)
 def human_bytes(size: int) -> str:
     val = float(max(size, 0))
     for unit in ["B", "KB", "MB", "GB", "TB", "PB"]:
@@ -181,6 +235,7 @@ class ScanConfig:
     skip_names: set[str] = dataclasses.field(default_factory=lambda: set(DEFAULT_SKIP_NAMES))
     include_hidden: bool = True
     store_dir_aggregate_depth: int = 2
+    scan_workers: int = 0  # 0 = auto; 1 keeps the scan single-threaded
 
 
 @dataclasses.dataclass(slots=True)
@@ -235,6 +290,12 @@ class FileClassifier:
         self.rules = {k: set(v) for k, v in self.DEFAULT_RULES.items()}
         if custom_rule_file:
             self._merge_custom_rules(custom_rule_file)
+        # First category listing an extension wins, as in the rule order.
+        self._ext_to_cat: dict[str, str] = {}
+        for cat, exts in self.rules.items():
+            for ext in exts:
+                self._ext_to_cat.setdefault(ext, cat)
+        self._log_exts = self.rules.get("logs", set())
 
     def _merge_custom_rules(self, rule_file: str) -> None:
         path = Path(rule_file)
@@ -252,14 +313,14 @@ class FileClassifier:
         p = path.lower()
         ext = extension.lower()
 
-        if any(seg in p for seg in ["/cache/", "/tmp/", "/var/tmp/"]):
-            return "logs" if ext in self.rules.get("logs", set()) else "other"
+        if _CACHE_SEGMENT_RE.search(p):
+            return "logs" if ext in self._log_exts else "other"
 
-        for cat, exts in self.rules.items():
-            if ext in exts:
-                return cat
+        cat = self._ext_to_cat.get(ext)
+        if cat is not None:
+            return cat
 
-        if p.startswith(("/etc/", "/usr/", "/var/lib/", "/bin/", "/sbin/")):
+        if p.startswith(_SYSTEM_PREFIXES):
             return "system"
         return "other"
 
@@ -277,7 +338,7 @@ class RiskScorer:
         reasons: list[str] = []
         score = 0
 
-        if rp in CRITICAL_DELETE_PATHS or any(is_subpath(rp, p) for p in CRITICAL_DELETE_PATHS if p != "/"):
+        if rp in _CRITICAL_REAL or rp.startswith(_CRITICAL_PREFIX_TUPLE):
             score += 95
             reasons.append("system-critical path")
 
@@ -316,11 +377,15 @@ class SnapshotStore:
     def __init__(self, db_path: Path):
         self.db_path = db_path
         ensure_parent(db_path)
-        self.conn = sqlite3.connect(str(db_path))
+        # Transactions are explicit (begin/commit below) rather than opened implicitly by the
+        # sqlite3 module before each DML statement.
+        self.conn = sqlite3.connect(str(db_path), isolation_level=None)
         self.conn.row_factory = sqlite3.Row
         self.conn.execute("PRAGMA journal_mode=WAL;")
         self.conn.execute("PRAGMA synchronous=NORMAL;")
         self.conn.execute("PRAGMA temp_store=MEMORY;")
+        self.conn.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE};")
+        self.conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE};")
         self._init_schema()
 
     def _init_schema(self) -> None:
@@ -351,14 +416,6 @@ class SnapshotStore:
               FOREIGN KEY(snapshot_id) REFERENCES snapshots(id)
             );
 
-            CREATE INDEX IF NOT EXISTS idx_files_snapshot ON files(snapshot_id);
-            CREATE INDEX IF NOT EXISTS idx_files_size ON files(snapshot_id, size);
-            CREATE INDEX IF NOT EXISTS idx_files_ext ON files(snapshot_id, extension);
-            CREATE INDEX IF NOT EXISTS idx_files_category ON files(snapshot_id, category);
-            CREATE INDEX IF NOT EXISTS idx_files_mtime ON files(snapshot_id, mtime);
-            CREATE INDEX IF NOT EXISTS idx_files_path ON files(snapshot_id, path);
-            CREATE INDEX IF NOT EXISTS idx_files_topdir ON files(snapshot_id, top_dir);
-
             CREATE TABLE IF NOT EXISTS cleanup_actions (
               action_id TEXT PRIMARY KEY,
               created_at TEXT NOT NULL,
@@ -392,17 +449,38 @@ class SnapshotStore:
             );
             """
         )
-        self.conn.commit()
+        self.create_file_indexes()
+
+    def create_file_indexes(self) -> None:
+        for name, cols in _FILE_INDEXES:
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON files({cols})")
+
+    def drop_file_indexes(self) -> None:
+        for name, _ in _FILE_INDEXES:
+            self.conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+    def has_files(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM files LIMIT 1").fetchone() is not None
 
     def close(self) -> None:
+        with contextlib.suppress(sqlite3.Error):
+            self.conn.execute("PRAGMA optimize;")
         self.conn.close()
 
+    def ensure_statistics(self) -> None:
+        # Without sqlite_stat1 the planner guesses between the snapshot_id-prefixed
+        # indexes; gather it once, after the first snapshot has real data.
+        row = self.conn.execute(
+            "SELECT COUNT(*) AS n FROM sqlite_master WHERE name='sqlite_stat1'"
+        ).fetchone()
+        if not row["n"]:
+            self.conn.execute("ANALYZE files;")
+
     def create_snapshot(self, roots: Sequence[str]) -> int:
         cur = self.conn.execute(
             "INSERT INTO snapshots(created_at, roots_json) VALUES(?, ?)",
             (now_utc_iso(), json.dumps(list(roots))),
         )
-        self.conn.commit()
         return int(cur.lastrowid)
 
     def finalize_snapshot(self, snapshot_id: int, total_files: int, total_bytes: int, duration_sec: float) -> None:
@@ -410,21 +488,30 @@ class SnapshotStore:
             "UPDATE snapshots SET total_files=?, total_bytes=?, duration_sec=? WHERE id=?",
             (total_files, total_bytes, duration_sec, snapshot_id),
         )
-        self.conn.commit()
+        self.commit()
 
-    def insert_file_batch(self, rows: list[tuple[Any, ...]]) -> None:
-        self.conn.executemany(
-            """
-            INSERT INTO files(
-              snapshot_id, path, dir_path, top_dir, size, extension, mtime,
-              permissions, is_hidden, is_symlink, category
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            rows,
-        )
+    def insert_file_batch(self, rows: Iterable[tuple[Any, ...]]) -> None:
+        # Without an open transaction every row would autocommit on its own.
+        self.begin()
+        self.conn.executemany(_INSERT_FILE_SQL, rows)
+
+    def set_bulk_ingest(self, enabled: bool) -> None:
+        # A snapshot can always be rebuilt by rescanning, so ingest skips fsyncs;
+        # normal durability is restored for everything else.
+        self.conn.execute("PRAGMA synchronous=OFF;" if enabled else "PRAGMA synchronous=NORMAL;")
+        self.conn.execute(f"PRAGMA cache_size={SQLITE_BULK_CACHE_SIZE if enabled else SQLITE_CACHE_SIZE};")
+
+    def begin(self) -> None:
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN IMMEDIATE")
 
     def commit(self) -> None:
-        self.conn.commit()
+        if self.conn.in_transaction:
+            self.conn.execute("COMMIT")
+
+    def rollback(self) -> None:
+        if self.conn.in_transaction:
+            self.conn.execute("ROLLBACK")
 
     def latest_snapshot(self) -> int | None:
         row = self.conn.execute("SELECT id FROM snapshots ORDER BY id DESC LIMIT 1").fetchone()
@@ -453,22 +540,147 @@ class FileScanner:
     def __init__(self, config: ScanConfig, classifier: FileClassifier):
         self.config = config
         self.classifier = classifier
-
-    def _should_skip_path(self, path: str) -> bool:
-        rp = os.path.realpath(path)
-        if any(rp == p or rp.startswith(p + os.sep) for p in self.config.skip_prefixes):
+        self._skip_exact = frozenset(config.skip_prefixes)
+        self._skip_prefix_tuple = tuple(p + os.sep for p in config.skip_prefixes)
+
+    def _should_skip_path(self, path: str, resolve: bool = False) -> bool:
+        # Roots are realpath'd once in scan_to_store and entries are joined onto them, so
+        # plain string checks suffice until the walk has passed through a followed symlink;
+        # below one, the unresolved path says nothing about where it really lives.
+        real = os.path.realpath(path) if resolve else path
+        if real in self._skip_exact or real.startswith(self._skip_prefix_tuple):
             return True
         if os.path.basename(path) in self.config.skip_names:
             return True
         return False
 
     def _top_dir(self, root: str, path: str, depth: int) -> str:
-        rel = os.path.relpath(path, root)
-        if rel == ".":
+        # Every scanned path is root + sep + rel, so slicing replaces relpath/join.
+        if path == root:
             return root
-        parts = rel.split(os.sep)
-        prefix = parts[: max(1, depth)]
-        return os.path.join(root, *prefix)
+        depth = max(1, depth)
+        cut = len(root) if root.endswith(os.sep) else len(root) + 1
+        for _ in range(depth):
+            cut = path.find(os.sep, cut + 1)
+            if cut < 0:
+                return path
+        return path[:cut]
+
+    def _scan_dir(
+        self, root: str, current: str, snapshot_id: int, via_link: bool = False
+    ) -> tuple[list[tuple[Any, ...]], int, list[tuple[str, bool]], list[dict[str, str]]]:
+        # via_link: current was reached through a followed directory symlink, so it and
+        # everything below it is realpath'd before the skip-prefix check.
+        rows: list[tuple[Any, ...]] = []
+        nbytes = 0
+        subdirs: list[tuple[str, bool]] = []
+        errors: list[dict[str, str]] = []
+
+        if self._should_skip_path(current, via_link):
+            return rows, nbytes, subdirs, errors
+
+        # Everything below is per entry; keep attribute lookups and per-directory work out of it.
+        follow = self.config.follow_symlinks
+        include_hidden = self.config.include_hidden
+        should_skip = self._should_skip_path
+        classify = self.classifier.classify
+        add_row = rows.append
+        add_subdir = subdirs.append
+        S_ISDIR, S_ISREG, S_ISLNK = stat.S_ISDIR, stat.S_ISREG, stat.S_ISLNK
+        top_dir = self._top_dir(root, current, self.config.store_dir_aggregate_depth)
+        try:
+            # Stat in inode order: on ext4/xfs inode tables are laid out roughly by number,
+            # so this turns scattered inode reads into mostly sequential ones.
+            with os.scandir(current) as it:
+                entries = sorted(it, key=os.DirEntry.inode)
+            for entry in entries:
+                full_path = entry.path
+                if should_skip(full_path, via_link):
+                    continue
+
+                name = entry.name
+                is_hidden = name[0] == "."
+                if not include_hidden and is_hidden:
+                    continue
+
+                # One lstat answers type, size, mtime and mode; only symlinks being
+                # followed need a second stat of their target.
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                    is_link = S_ISLNK(st.st_mode)
+                    if is_link:
+                        if not follow:
+                            continue
+                        st = os.stat(full_path)
+                except FileNotFoundError:
+                    continue
+                except OSError as exc:
+                    errors.append({"path": full_path, "error": str(exc)})
+                    continue
+                # A followed link may point into a skipped tree, whatever its target type.
+                if is_link and not via_link and should_skip(full_path, True):
+                    continue
+                mode = st.st_mode
+
+                if S_ISDIR(mode):
+                    add_subdir((full_path, via_link or is_link))
+                    continue
+
+                if not S_ISREG(mode):
+                    continue
+
+                # Same rule as PurePath.suffix, without building a Path per entry.
+                dot = name.rfind(".")
+                ext = name[dot:].lower() if 0 < dot < len(name) - 1 else ""
+                size = st.st_size
+
+                add_row((
+                    snapshot_id,
+                    full_path,
+                    current,
+                    top_dir,
+                    size,
+                    ext,
+                    st.st_mtime,
+                    _PERMISSION_STRINGS[mode & 0o777],
+                    1 if is_hidden else 0,
+                    1 if is_link else 0,
+                    classify(full_path, ext),
+                ))
+                nbytes += size
+        except OSError as exc:
+            errors.append({"path": current, "error": str(exc)})
+        return rows, nbytes, subdirs, errors
+
+    def _walk_root(
+        self,
+        root: str,
+        snapshot_id: int,
+        pool: concurrent.futures.ThreadPoolExecutor | None,
+    ) -> Iterator[tuple[list[tuple[Any, ...]], int, list[dict[str, str]]]]:
+        rows, nbytes, subdirs, errors = self._scan_dir(root, root, snapshot_id)
+        yield rows, nbytes, errors
+
+        # Narrow roots gain little from threads; walk them breadth-first in this thread so
+        # siblings, whose dentries and inodes tend to sit together, are visited together.
+        if pool is None or len(subdirs) <= PARALLEL_SCAN_MIN_SUBDIRS:
+            queue = deque(subdirs)
+            while queue:
+                d, via_link = queue.popleft()
+                rows, nbytes, subdirs, errors = self._scan_dir(root, d, snapshot_id, via_link)
+                queue.extend(subdirs)
+                yield rows, nbytes, errors
+            return
+
+        # One task per directory so scandir/stat latency overlaps across threads; rows come
+        # back here, keeping all SQLite writes on the calling thread.
+        pending = {pool.submit(self._scan_dir, root, d, snapshot_id, via) for d, via in subdirs}
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for fut in done:
+                rows, nbytes, subdirs, errors = fut.result()
+                pending.update(pool.submit(self._scan_dir, root, d, snapshot_id, via) for d, via in subdirs)
+                yield rows, nbytes, errors
 
     def scan_to_store(self, store: SnapshotStore, snapshot_id: int) -> dict[str, Any]:
         started = time.perf_counter()
@@ -476,86 +688,59 @@ class FileScanner:
         total_bytes = 0
         errors: list[dict[str, str]] = []
 
-        batch: list[tuple[Any, ...]] = []
+        # Per-directory row lists are handed to executemany as one chained iterator,
+        # rather than copied into a second flat list first.
+        batch: list[list[tuple[Any, ...]]] = []
+        batch_rows = 0
 
         roots = [os.path.realpath(os.path.expanduser(r)) for r in self.config.roots]
         roots = [r for r in roots if os.path.isdir(r)]
 
-        for root in roots:
-            if self._should_skip_path(root):
-                continue
-            stack = [root]
-            while stack:
-                current = stack.pop()
-                if self._should_skip_path(current):
-                    continue
-
-                try:
-                    with os.scandir(current) as it:
-                        for entry in it:
-                            full_path = entry.path
-                            if self._should_skip_path(full_path):
-                                continue
-
-                            name = entry.name
-                            if not self.config.include_hidden and name.startswith("."):
-                                continue
-
-                            try:
-                                is_dir = entry.is_dir(follow_symlinks=self.config.follow_symlinks)
-                                is_file = entry.is_file(follow_symlinks=self.config.follow_symlinks)
-                            except OSError as exc:
-                                errors.append({"path": full_path, "error": str(exc)})
-                                continue
-
-                            if is_dir:
-                                stack.append(full_path)
-                                continue
-
-                            if not is_file:
-                                continue
-
-                            try:
-                                st = entry.stat(follow_symlinks=self.config.follow_symlinks)
-                            except OSError as exc:
-                                errors.append({"path": full_path, "error": str(exc)})
-                                continue
-
-                            ext = Path(name).suffix.lower()
-                            category = self.classifier.classify(full_path, ext)
-                            dir_path = os.path.dirname(full_path)
-                            top_dir = self._top_dir(root, dir_path, self.config.store_dir_aggregate_depth)
-
-                            row = (
-                                snapshot_id,
-                                full_path,
-                                dir_path,
-                                top_dir,
-                                int(st.st_size),
-                                ext,
-                                float(st.st_mtime),
-                                oct(st.st_mode & 0o777),
-                                1 if name.startswith(".") else 0,
-                                1 if entry.is_symlink() else 0,
-                                category,
-                            )
-                            batch.append(row)
-                            total_files += 1
-                            total_bytes += int(st.st_size)
-
-                            if len(batch) >= SCAN_BATCH_SIZE:
-                                store.insert_file_batch(batch)
-                                store.commit()
-                                batch.clear()
-                except OSError as exc:
-                    errors.append({"path": current, "error": str(exc)})
+        workers = self.config.scan_workers or min(32, (os.cpu_count() or 1) * 2)
 
-        if batch:
-            store.insert_file_batch(batch)
-            store.commit()
-
-        duration = time.perf_counter() - started
-        store.finalize_snapshot(snapshot_id, total_files, total_bytes, duration)
+        # One transaction for the whole ingest; committing per batch costs a WAL fsync each time.
+        # finalize_snapshot() commits it.
+        store.set_bulk_ingest(True)
+        store.begin()
+        try:
+            # Into an empty table it is cheaper to build the indexes once at the end than to
+            # maintain every files index per row. With earlier snapshots present a rebuild would
+            # re-sort all of their rows too, so the indexes stay in place. DDL is part of the
+            # transaction, so a failed scan rolls the drop back as well.
+            rebuild_indexes = not store.has_files()
+            if rebuild_indexes:
+                store.drop_file_indexes()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+                for root in roots:
+                    if self._should_skip_path(root):
+                        continue
+                    for rows, nbytes, errs in self._walk_root(root, snapshot_id, pool if workers > 1 else None):
+                        errors.extend(errs)
+                        if not rows:
+                            continue
+                        batch.append(rows)
+                        batch_rows += len(rows)
+                        total_files += len(rows)
+                        total_bytes += nbytes
+
+                        if batch_rows >= SCAN_BATCH_SIZE:
+                            store.insert_file_batch(itertools.chain.from_iterable(batch))
+                            batch.clear()
+                            batch_rows = 0
+
+            if batch:
+                store.insert_file_batch(itertools.chain.from_iterable(batch))
+
+            if rebuild_indexes:
+                store.create_file_indexes()
+            duration = time.perf_counter() - started
+            store.finalize_snapshot(snapshot_id, total_files, total_bytes, duration)
+        except BaseException:
+            store.rollback()
+            raise
+        finally:
+            store.set_bulk_ingest(False)
+        store.ensure_statistics()
 
         return {
             "snapshot_id": snapshot_id,
@@ -689,51 +874,77 @@ class DiskAnalyzer:
         ]
 
     def pareto_top_consumers(self) -> dict[str, Any]:
-        folders = self.folder_sizes(limit=20000)
-        total = sum(item["bytes"] for item in folders) or 1
+        # Running totals come from a window function, so only the folders inside the 80% cut
+        # (plus the overall totals riding along on each row) leave SQLite.
+        rows = self.store.conn.execute(
+            """
+            WITH agg AS (
+              SELECT top_dir, SUM(size) AS b, COUNT(*) AS n
+              FROM files
+              WHERE snapshot_id=?
+              GROUP BY top_dir
+              ORDER BY b DESC, top_dir
+              LIMIT 20000
+            ), ranked AS (
+              SELECT top_dir, b, n,
+                     SUM(b) OVER (ORDER BY b DESC, top_dir ROWS UNBOUNDED PRECEDING) AS running,
+                     SUM(b) OVER () AS total,
+                     COUNT(*) OVER () AS folders
+              FROM agg
+            )
+            SELECT top_dir, b, n, running, total, folders
+            FROM ranked
+            WHERE running - b < MAX(total, 1) * 0.8
+            ORDER BY b DESC, top_dir
+            """,
+            (self.snapshot_id,),
+        ).fetchall()
+
+        total = (int(rows[0]["total"]) if rows else 0) or 1
         target = total * 0.8
-        running = 0
-        chosen: list[dict[str, Any]] = []
-        for f in folders:
-            chosen.append(f)
-            running += f["bytes"]
-            if running >= target:
-                break
+        running = int(rows[-1]["running"]) if rows else 0
+        chosen = [
+            {
+                "folder": r["top_dir"],
+                "bytes": int(r["b"]),
+                "bytes_human": human_bytes(int(r["b"])),
+                "file_count": int(r["n"]),
+            }
+            for r in rows[:200]
+        ]
 
         return {
             "target_bytes_80pct": int(target),
             "target_human_80pct": human_bytes(int(target)),
-            "folder_count_needed": len(chosen),
-            "total_folders": len(folders),
+            "folder_count_needed": len(rows),
+            "total_folders": int(rows[0]["folders"]) if rows else 0,
             "coverage_pct": round(running * 100.0 / total, 2),
-            "top_consumers": chosen[:200],
+            "top_consumers": chosen,
         }
 
     def size_histogram(self) -> dict[str, int]:
-        rows = self.store.conn.execute(
-            "SELECT size FROM files WHERE snapshot_id=?",
-            (self.snapshot_id,),
-        )
         bins = self.SIZE_HIST_BINS
         labels = []
         for i in range(len(bins) - 1):
             labels.append(f"{human_bytes(bins[i])}-{human_bytes(bins[i + 1])}")
         labels.append(f">={human_bytes(bins[-1])}")
 
-        hist = Counter({label: 0 for label in labels})
+        # Bucket inside SQLite so only one row per bin crosses into Python.
+        whens = " ".join(f"WHEN size < {bins[i + 1]} THEN {i}" for i in range(len(bins) - 1))
+        rows = self.store.conn.execute(
+            f"""
+            SELECT CASE {whens} ELSE {len(bins) - 1} END AS bucket, COUNT(*) AS n
+            FROM files
+            WHERE snapshot_id=?
+            GROUP BY bucket
+            """,
+            (self.snapshot_id,),
+        ).fetchall()
 
+        hist = dict.fromkeys(labels, 0)
         for r in rows:
-            size = int(r["size"])
-            placed = False
-            for i in range(len(bins) - 1):
-                if bins[i] <= size < bins[i + 1]:
-                    hist[labels[i]] += 1
-                    placed = True
-                    break
-            if not placed:
-                hist[labels[-1]] += 1
-
-        return dict(hist)
+            hist[labels[int(r["bucket"])]] += int(r["n"])
+        return hist
 
     def large_files(self, min_size: int, limit: int = 1000) -> list[dict[str, Any]]:
         rows = self.store.conn.execute(
@@ -819,31 +1030,29 @@ class DiskAnalyzer:
         prev_total = int(prev_row["total_bytes"])
         delta = cur_total - prev_total
 
-        cur_dirs = self.store.conn.execute(
-            "SELECT top_dir, SUM(size) AS b FROM files WHERE snapshot_id=? GROUP BY top_dir",
-            (self.snapshot_id,),
-        ).fetchall()
-        prev_dirs = self.store.conn.execute(
-            "SELECT top_dir, SUM(size) AS b FROM files WHERE snapshot_id=? GROUP BY top_dir",
-            (prev,),
+        # Both snapshots are grouped in one pass and only non-zero deltas leave SQLite.
+        rows = self.store.conn.execute(
+            """
+            SELECT top_dir,
+                   SUM(CASE WHEN snapshot_id=? THEN size ELSE -size END) AS delta
+            FROM files
+            WHERE snapshot_id IN (?, ?)
+            GROUP BY top_dir
+            HAVING delta <> 0
+            ORDER BY ABS(delta) DESC, top_dir
+            LIMIT 200
+            """,
+            (self.snapshot_id, self.snapshot_id, prev),
         ).fetchall()
-
-        cur_map = {r["top_dir"]: int(r["b"]) for r in cur_dirs}
-        prev_map = {r["top_dir"]: int(r["b"]) for r in prev_dirs}
-
-        all_dirs = set(cur_map) | set(prev_map)
-        dir_growth = []
-        for d in all_dirs:
-            diff = cur_map.get(d, 0) - prev_map.get(d, 0)
-            if diff != 0:
-                dir_growth.append({
-                    "folder": d,
-                    "delta_bytes": diff,
-                    "delta_human": human_bytes(abs(diff)),
-                    "direction": "growth" if diff > 0 else "shrink",
-                })
-
-        dir_growth.sort(key=lambda x: abs(x["delta_bytes"]), reverse=True)
+        dir_growth = [
+            {
+                "folder": r["top_dir"],
+                "delta_bytes": int(r["delta"]),
+                "delta_human": human_bytes(abs(int(r["delta"]))),
+                "direction": "growth" if r["delta"] > 0 else "shrink",
+            }
+            for r in rows
+        ]
 
         churn = self._file_churn(prev)
 
@@ -856,48 +1065,26 @@ class DiskAnalyzer:
             "delta_bytes": delta,
             "delta_human": human_bytes(abs(delta)),
             "direction": "growth" if delta > 0 else "shrink" if delta < 0 else "flat",
-            "folder_level_changes": dir_growth[:200],
+            "folder_level_changes": dir_growth,
             "file_churn": churn,
         }
 
     def _file_churn(self, prev_snapshot_id: int) -> dict[str, Any]:
-        # Added files: exists now not before (by path)
-        added = self.store.conn.execute(
-            """
-            SELECT COUNT(*) AS n
-            FROM files c
-            WHERE c.snapshot_id=?
-              AND NOT EXISTS (
-                SELECT 1 FROM files p
-                WHERE p.snapshot_id=? AND p.path=c.path
-              )
-            """,
-            (self.snapshot_id, prev_snapshot_id),
-        ).fetchone()["n"]
-
-        removed = self.store.conn.execute(
+        # Set-oriented: each snapshot is materialized once and the three counts are
+        # computed from those, instead of a correlated probe per row per query.
+        row = self.store.conn.execute(
             """
-            SELECT COUNT(*) AS n
-            FROM files p
-            WHERE p.snapshot_id=?
-              AND NOT EXISTS (
-                SELECT 1 FROM files c
-                WHERE c.snapshot_id=? AND c.path=p.path
-              )
-            """,
-            (prev_snapshot_id, self.snapshot_id),
-        ).fetchone()["n"]
-
-        changed = self.store.conn.execute(
-            """
-            SELECT COUNT(*) AS n
-            FROM files c
-            JOIN files p ON c.path=p.path
-            WHERE c.snapshot_id=? AND p.snapshot_id=?
-              AND (c.size != p.size OR c.mtime != p.mtime)
+            WITH c AS (SELECT path, size, mtime FROM files WHERE snapshot_id=?),
+                 p AS (SELECT path, size, mtime FROM files WHERE snapshot_id=?)
+            SELECT
+              (SELECT COUNT(*) FROM (SELECT path FROM c EXCEPT SELECT path FROM p)) AS added,
+              (SELECT COUNT(*) FROM (SELECT path FROM p EXCEPT SELECT path FROM c)) AS removed,
+              (SELECT COUNT(*) FROM c JOIN p USING(path)
+                WHERE c.size != p.size OR c.mtime != p.mtime) AS changed
             """,
             (self.snapshot_id, prev_snapshot_id),
-        ).fetchone()["n"]
+        ).fetchone()
+        added, removed, changed = row["added"], row["removed"], row["changed"]
 
         total = self.store.snapshot_row(self.snapshot_id)["total_files"] or 1
         churn_rate = (int(added) + int(removed) + int(changed)) * 100.0 / int(total)
@@ -924,7 +1111,10 @@ class DiskAnalyzer:
         ]
 
     def predict_disk_fill(self) -> dict[str, Any]:
-        history = self.growth_history()
+        # Only the two regression columns; growth_history() would also format every row.
+        history = self.store.conn.execute(
+            "SELECT created_at, total_bytes FROM snapshots ORDER BY id ASC"
+        ).fetchall()
         if len(history) < 3:
             return {
                 "has_prediction": False,
@@ -932,29 +1122,19 @@ class DiskAnalyzer:
                 "points": len(history),
             }
 
-        t0 = dt.datetime.fromisoformat(history[0]["created_at"]).timestamp()
-        x = []
-        y = []
-        for h in history:
-            ts = dt.datetime.fromisoformat(h["created_at"]).timestamp()
-            days = (ts - t0) / 86400.0
-            x.append(days)
-            y.append(float(h["total_bytes"]))
+        stamps = [dt.datetime.fromisoformat(h["created_at"]).timestamp() for h in history]
+        x = [(ts - stamps[0]) / 86400.0 for ts in stamps]
+        y = [float(h["total_bytes"]) for h in history]
 
         # Linear regression y = a + b*x
-        n = len(x)
-        mean_x = statistics.fmean(x)
-        mean_y = statistics.fmean(y)
-        num = sum((xi - mean_x) * (yi - mean_y) for xi, yi in zip(x, y))
-        den = sum((xi - mean_x) ** 2 for xi in x)
-        if den == 0:
+        try:
+            slope, intercept = statistics.linear_regression(x, y)
+        except statistics.StatisticsError:
             return {
                 "has_prediction": False,
                 "assumptions": ["Insufficient time variance between snapshots."],
                 "points": len(history),
             }
-        slope = num / den
-        intercept = mean_y - slope * mean_x
 
         roots = self.summary().get("roots", [])
         root = roots[0] if roots else "/"
@@ -997,32 +1177,75 @@ class DiskAnalyzer:
 
 # --------------------------- Duplicate Detection ---------------------------- #
 
+_file_digest = getattr(hashlib, "file_digest", None)  # Python 3.11+
+_HAVE_FADVISE = hasattr(os, "posix_fadvise")
+_O_NOATIME = getattr(os, "O_NOATIME", 0)
 
-def _hash_partial(path: str, bytes_to_read: int = PARTIAL_HASH_BYTES) -> tuple[str, str | None, str | None]:
-    try:
-        h = hashlib.sha256()
-        with open(path, "rb") as f:
-            chunk = f.read(bytes_to_read)
-            h.update(chunk)
-        return path, h.hexdigest(), None
-    except Exception as exc:  # pylint: disable=broad-except
-        return path, None, str(exc)
 
+def _open_for_hash(path: str) -> int:
+    # O_NOATIME saves an atime write per file read, but Linux only allows it to the file's
+    # owner (or CAP_FOWNER); anything else gets EPERM and is reopened without it.
+    if _O_NOATIME:
+        try:
+            return os.open(path, os.O_RDONLY | _O_NOATIME)
+        except PermissionError:
+            pass
+    return os.open(path, os.O_RDONLY)
 
-def _hash_full(path: str, buffer_size: int = FULL_HASH_BUFFER) -> tuple[str, str | None, str | None]:
+
+def _hash_partial(
+    path: str, bytes_to_read: int = PARTIAL_HASH_BYTES
+) -> tuple[str, str | None, str | None, bool]:
+    # The trailing flag is True when the prefix turned out to be the whole file.
     try:
-        h = hashlib.sha256()
-        with open(path, "rb") as f:
-            while True:
-                chunk = f.read(buffer_size)
+        # Raw fd I/O: open() would add fstat/ioctl/lseek calls for a buffered reader used once.
+        h = _content_hasher()
+        fd = _open_for_hash(path)
+        try:
+            remaining = bytes_to_read
+            while remaining > 0:
+                chunk = os.read(fd, remaining)
                 if not chunk:
                     break
                 h.update(chunk)
+                remaining -= len(chunk)
+        finally:
+            os.close(fd)
+        return path, h.hexdigest(), None, remaining > 0
+    except Exception as exc:  # pylint: disable=broad-except
+        return path, None, str(exc), False
+
+
+def _hash_full(path: str, buffer_size: int = FULL_HASH_BUFFER) -> tuple[str, str | None, str | None]:
+    try:
+        # Unbuffered so file_digest readinto()s its own reused buffer with no extra copy. It is
+        # still a Python-level loop; only each read and hash update releases the GIL.
+        with os.fdopen(_open_for_hash(path), "rb", buffering=0) as f:
+            fd = f.fileno()
+            if _HAVE_FADVISE:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            try:
+                if _file_digest is not None:
+                    return path, _file_digest(f, _content_hasher).hexdigest(), None
+                h = _content_hasher()
+                while True:
+                    chunk = f.read(buffer_size)
+                    if not chunk:
+                        break
+                    h.update(chunk)
+            finally:
+                # Read-once data: don't let a large dedup pass evict the page cache.
+                if _HAVE_FADVISE:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
         return path, h.hexdigest(), None
     except Exception as exc:  # pylint: disable=broad-except
         return path, None, str(exc)
 
 
+def _hash_batch(fn: Any, paths: list[str]) -> list[tuple[Any, ...]]:
+    return [fn(p) for p in paths]
+
+
 class DuplicateDetector:
     """Three-phase duplicate detector with multiprocessing for hashing."""
 
@@ -1035,34 +1258,59 @@ class DuplicateDetector:
         self,
         fn: Any,
         paths: list[str],
-        chunksize: int,
-    ) -> Iterator[tuple[str, str | None, str | None]]:
+        batch_size: int,
+    ) -> Iterator[tuple[Any, ...]]:
+        # Each task hashes a whole batch and sends its results back as one list, so pickling
+        # and dispatch are paid per batch rather than per file.
+        batches = [paths[i : i + batch_size] for i in range(0, len(paths), batch_size)]
+        work = functools.partial(_hash_batch, fn)
         try:
             with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as ex:
-                yield from ex.map(fn, paths, chunksize=chunksize)
+                for results in ex.map(work, batches):
+                    yield from results
             return
         except (PermissionError, OSError):
             # Fallback for restricted environments where process pools are blocked.
             pass
 
         with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as ex:
-            yield from ex.map(fn, paths, chunksize=chunksize)
+            for results in ex.map(work, batches):
+                yield from results
 
     def find_duplicates(self, limit_candidate_groups: int = 200000) -> dict[str, Any]:
+        # One query for every file that shares its size with another, most populous sizes
+        # first (they are kept if the candidate limit truncates). size_groups rides along on
+        # each row via a window count over the grouped sizes.
         cur = self.store.conn.execute(
             """
-            SELECT size, COUNT(*) AS c
-            FROM files
-            WHERE snapshot_id=? AND size>0
-            GROUP BY size
-            HAVING c > 1
-            ORDER BY c DESC
+            WITH s AS (
+              SELECT size, COUNT(*) AS c, COUNT(*) OVER () AS size_groups
+              FROM files
+              WHERE snapshot_id=? AND size>0
+              GROUP BY size
+              HAVING c > 1
+            )
+            SELECT f.path, f.size, f.mtime, s.size_groups
+            FROM s JOIN files f ON f.snapshot_id=? AND f.size=s.size
+            ORDER BY s.c DESC, s.size, f.id
+            LIMIT ?
             """,
-            (self.snapshot_id,),
+            (self.snapshot_id, self.snapshot_id, limit_candidate_groups),
         )
 
-        candidate_sizes = [int(r["size"]) for r in cur.fetchall()]
-        if not candidate_sizes:
+        # Candidates are held column-wise and referred to by index from here on, instead of
+        # one dict per file plus a path->dict map.
+        paths: list[str] = []
+        sizes = array.array("q")
+        mtimes = array.array("d")
+        errors: list[dict[str, Any]] = []
+        size_groups = 0
+        for path, size, mtime, size_groups in cur:
+            paths.append(path)
+            sizes.append(size)
+            mtimes.append(mtime)
+
+        if not paths:
             return {
                 "cluster_count": 0,
                 "potential_waste_bytes": 0,
@@ -1071,70 +1319,63 @@ class DuplicateDetector:
                 "phase_stats": {"size_groups": 0, "partial_groups": 0, "full_groups": 0},
             }
 
-        # Fetch candidate files by size
-        candidates: list[dict[str, Any]] = []
-        errors: list[dict[str, Any]] = []
-
-        for size in candidate_sizes:
-            rows = self.store.conn.execute(
-                "SELECT path, size, mtime FROM files WHERE snapshot_id=? AND size=?",
-                (self.snapshot_id, size),
-            ).fetchall()
-            for r in rows:
-                candidates.append({
-                    "path": r["path"],
-                    "size": int(r["size"]),
-                    "mtime": float(r["mtime"]),
-                })
-
-        if len(candidates) > limit_candidate_groups:
-            candidates = candidates[:limit_candidate_groups]
-
-        # Phase 2: partial hash
-        path_meta = {c["path"]: c for c in candidates}
-        partial_groups: dict[tuple[int, str], list[dict[str, Any]]] = defaultdict(list)
-        for path, digest, err in self._hash_map(_hash_partial, [c["path"] for c in candidates], chunksize=64):
-            c = path_meta.get(path)
-            if c is None:
-                continue
+        # Phase 2: partial hash. _hash_map yields results in input order, so the position is
+        # the candidate index.
+        partial_groups: dict[tuple[int, str], list[int]] = defaultdict(list)
+        complete: set[int] = set()
+        for i, (path, digest, err, is_complete) in enumerate(
+            self._hash_map(_hash_partial, paths, PARTIAL_HASH_BATCH)
+        ):
             if err or not digest:
                 errors.append({"path": path, "error": err or "partial hash failed"})
                 continue
-            partial_groups[(c["size"], digest)].append(c)
+            partial_groups[(sizes[i], digest)].append(i)
+            if is_complete:
+                complete.add(i)
 
-        # Phase 3: full hash for partial collisions
+        # Phase 3: full hash for partial collisions. Files the partial read covered end to end
+        # already have their full digest, so only the longer ones are read again.
         full_candidates = [group for group in partial_groups.values() if len(group) > 1]
-        flat_full = list(itertools.chain.from_iterable(full_candidates))
 
-        full_digest_by_path: dict[str, str] = {}
-        for path, digest, err in self._hash_map(_hash_full, [c["path"] for c in flat_full], chunksize=32):
+        full_digest: list[str | None] = [None] * len(paths)
+        to_hash: list[int] = []
+        for (_, digest), group in partial_groups.items():
+            if len(group) < 2:
+                continue
+            for i in group:
+                if i in complete:
+                    full_digest[i] = digest
+                else:
+                    to_hash.append(i)
+
+        for (path, digest, err), i in zip(
+            self._hash_map(_hash_full, [paths[i] for i in to_hash], FULL_HASH_BATCH), to_hash
+        ):
             if err or not digest:
                 errors.append({"path": path, "error": err or "full hash failed"})
                 continue
-            full_digest_by_path[path] = digest
+            full_digest[i] = digest
 
-        by_full: dict[str, list[dict[str, Any]]] = defaultdict(list)
-        for c in flat_full:
-            d = full_digest_by_path.get(c["path"])
+        by_full: dict[str, list[int]] = defaultdict(list)
+        for i in itertools.chain.from_iterable(full_candidates):
+            d = full_digest[i]
             if d:
-                by_full[d].append(c)
+                by_full[d].append(i)
 
         clusters: list[DuplicateCluster] = []
         for digest, group in by_full.items():
             if len(group) < 2:
                 continue
             # keep oldest modified file (conservative)
-            group_sorted = sorted(group, key=lambda x: (x["mtime"], x["path"]))
-            keep = group_sorted[0]
-            remove = [g["path"] for g in group_sorted[1:]]
-            size_each = group_sorted[0]["size"]
+            group.sort(key=lambda i: (mtimes[i], paths[i]))
+            size_each = sizes[group[0]]
             cluster = DuplicateCluster(
                 cluster_id=digest[:16],
                 size_each=size_each,
-                file_count=len(group_sorted),
-                potential_waste=size_each * (len(group_sorted) - 1),
-                keep_path=keep["path"],
-                remove_paths=remove,
+                file_count=len(group),
+                potential_waste=size_each * (len(group) - 1),
+                keep_path=paths[group[0]],
+                remove_paths=[paths[i] for i in group[1:]],
             )
             clusters.append(cluster)
 
@@ -1146,7 +1387,7 @@ class DuplicateDetector:
             "potential_waste_bytes": total_waste,
             "potential_waste_human": human_bytes(total_waste),
             "phase_stats": {
-                "size_groups": len(candidate_sizes),
+                "size_groups": int(size_groups),
                 "partial_groups": len(partial_groups),
                 "full_groups": len(by_full),
             },
@@ -1173,77 +1414,82 @@ class DevWasteAnalyzer:
 
     BUILD_HINTS = {"dist", "build", "target", ".next", ".nuxt", "out", "coverage"}
 
+    # Waste kinds reported per top_dir: (type, SQL match condition, recommendation).
+    LOCATION_KINDS = [
+        (
+            "node_modules_duplication",
+            "path LIKE '%/node_modules/%'",
+            "Review monorepo/package dedupe and remove unused node_modules trees.",
+        ),
+        (
+            "virtualenv_accumulation",
+            "(path LIKE '%/.venv/%' OR path LIKE '%/venv/%' OR path LIKE '%/env/%')",
+            "Remove stale virtual environments and rebuild from lock files when needed.",
+        ),
+        (
+            "build_artifacts",
+            "(path LIKE '%/dist/%' OR path LIKE '%/build/%' OR path LIKE '%/target/%' OR "
+            "path LIKE '%/.next/%' OR path LIKE '%/.nuxt/%' OR path LIKE '%/coverage/%')",
+            "Delete generated artifacts that can be rebuilt from source.",
+        ),
+    ]
+
     def __init__(self, store: SnapshotStore, snapshot_id: int):
         self.store = store
         self.snapshot_id = snapshot_id
 
-    def analyze(self) -> dict[str, Any]:
-        suggestions: list[dict[str, Any]] = []
-
-        # node_modules
-        node = self.store.conn.execute(
-            """
-            SELECT top_dir, SUM(size) AS b, COUNT(*) AS c
-            FROM files
-            WHERE snapshot_id=? AND path LIKE '%/node_modules/%'
+    def _scan_patterns(self) -> list[sqlite3.Row]:
+        # One pass over the snapshot: each row is tested against every kind and cache pattern
+        # once, and the flags are summed per top_dir, instead of one full scan per LIKE query.
+        flags = [cond for _, cond, _ in self.LOCATION_KINDS] + ["path LIKE ?"] * len(self.CACHE_PATTERNS)
+        sums = ", ".join(f"SUM(m{i} * size) AS b{i}, SUM(m{i}) AS c{i}" for i in range(len(flags)))
+        cols = ", ".join(f"{cond} AS m{i}" for i, cond in enumerate(flags))
+        return self.store.conn.execute(
+            f"""
+            SELECT top_dir, {sums}
+            FROM (SELECT top_dir, size, {cols} FROM files WHERE snapshot_id=?)
             GROUP BY top_dir
-            ORDER BY b DESC
-            LIMIT 200
+            HAVING {" OR ".join(f"c{i} > 0" for i in range(len(flags)))}
             """,
-            (self.snapshot_id,),
+            (*(f"%{patt}%" for patt in self.CACHE_PATTERNS), self.snapshot_id),
         ).fetchall()
-        if node:
-            total = sum(int(r["b"]) for r in node)
-            suggestions.append({
-                "type": "node_modules_duplication",
-                "estimated_bytes": total,
-                "estimated_human": human_bytes(total),
-                "recommendation": "Review monorepo/package dedupe and remove unused node_modules trees.",
-                "top_locations": [
-                    {"folder": r["top_dir"], "bytes": int(r["b"]), "bytes_human": human_bytes(int(r["b"])), "files": int(r["c"])}
-                    for r in node[:20]
-                ],
-            })
 
-        # virtualenvs
-        venv = self.store.conn.execute(
-            """
-            SELECT top_dir, SUM(size) AS b, COUNT(*) AS c
-            FROM files
-            WHERE snapshot_id=?
-              AND (path LIKE '%/.venv/%' OR path LIKE '%/venv/%' OR path LIKE '%/env/%')
-            GROUP BY top_dir
-            ORDER BY b DESC
-            LIMIT 200
-            """,
-            (self.snapshot_id,),
-        ).fetchall()
-        if venv:
-            total = sum(int(r["b"]) for r in venv)
-            suggestions.append({
-                "type": "virtualenv_accumulation",
-                "estimated_bytes": total,
-                "estimated_human": human_bytes(total),
-                "recommendation": "Remove stale virtual environments and rebuild from lock files when needed.",
-                "top_locations": [
-                    {"folder": r["top_dir"], "bytes": int(r["b"]), "bytes_human": human_bytes(int(r["b"])), "files": int(r["c"])}
-                    for r in venv[:20]
-                ],
-            })
+    def _locations_suggestion(self, rows: list[sqlite3.Row], i: int) -> dict[str, Any] | None:
+        kind, _, recommendation = self.LOCATION_KINDS[i]
+        locs = sorted(
+            ((r["top_dir"], int(r[f"b{i}"]), int(r[f"c{i}"])) for r in rows if r[f"c{i}"]),
+            key=lambda x: x[1],
+            reverse=True,
+        )[:200]
+        if not locs:
+            return None
+        total = sum(b for _, b, _ in locs)
+        return {
+            "type": kind,
+            "estimated_bytes": total,
+            "estimated_human": human_bytes(total),
+            "recommendation": recommendation,
+            "top_locations": [
+                {"folder": folder, "bytes": b, "bytes_human": human_bytes(b), "files": c}
+                for folder, b, c in locs[:20]
+            ],
+        }
+
+    def analyze(self) -> dict[str, Any]:
+        suggestions: list[dict[str, Any]] = []
+        rows = self._scan_patterns()
+
+        # node_modules, then virtualenvs
+        for i in (0, 1):
+            found = self._locations_suggestion(rows, i)
+            if found:
+                suggestions.append(found)
 
         # package caches
         cache_hits = []
-        for patt in self.CACHE_PATTERNS:
-            r = self.store.conn.execute(
-                """
-                SELECT SUM(size) AS b, COUNT(*) AS c
-                FROM files
-                WHERE snapshot_id=? AND path LIKE ?
-                """,
-                (self.snapshot_id, f"%{patt}%"),
-            ).fetchone()
-            b = int(r["b"] or 0)
-            c = int(r["c"] or 0)
+        for j, patt in enumerate(self.CACHE_PATTERNS, start=len(self.LOCATION_KINDS)):
+            b = sum(int(r[f"b{j}"]) for r in rows)
+            c = sum(int(r[f"c{j}"]) for r in rows)
             if b > 0:
                 cache_hits.append({"pattern": patt, "bytes": b, "bytes_human": human_bytes(b), "files": c})
 
@@ -1258,32 +1504,9 @@ class DevWasteAnalyzer:
             })
 
         # build artifacts
-        builds = self.store.conn.execute(
-            """
-            SELECT top_dir, SUM(size) AS b, COUNT(*) AS c
-            FROM files
-            WHERE snapshot_id=? AND (
-                path LIKE '%/dist/%' OR path LIKE '%/build/%' OR path LIKE '%/target/%' OR
-                path LIKE '%/.next/%' OR path LIKE '%/.nuxt/%' OR path LIKE '%/coverage/%'
-            )
-            GROUP BY top_dir
-            ORDER BY b DESC
-            LIMIT 200
-            """,
-            (self.snapshot_id,),
-        ).fetchall()
-        if builds:
-            total = sum(int(r["b"]) for r in builds)
-            suggestions.append({
-                "type": "build_artifacts",
-                "estimated_bytes": total,
-                "estimated_human": human_bytes(total),
-                "recommendation": "Delete generated artifacts that can be rebuilt from source.",
-                "top_locations": [
-                    {"folder": r["top_dir"], "bytes": int(r["b"]), "bytes_human": human_bytes(int(r["b"])), "files": int(r["c"])}
-                    for r in builds[:20]
-                ],
-            })
+        found = self._locations_suggestion(rows, 2)
+        if found:
+            suggestions.append(found)
 
         # docker dangling images (suggest only)
         docker_info = self._docker_dangling_info()
@@ -1398,7 +1621,7 @@ class CleanupEngine:
             "INSERT INTO cleanup_actions(action_id, created_at, snapshot_id, mode, dry_run, details_json) VALUES (?, ?, ?, ?, ?, ?)",
             (action_id, now_utc_iso(), self.snapshot_id, mode, 1 if policy.dry_run else 0, json.dumps(details)),
         )
-        self.store.conn.commit()
+        self.store.begin()
 
         results = {
             "action_id": action_id,
@@ -1479,7 +1702,7 @@ class CleanupEngine:
                 results["failed"] += 1
                 self.logger.error("cleanup_failed action=%s path=%s err=%s", action_id, rp, exc)
 
-        self.store.conn.commit()
+        self.store.commit()
         results["estimated_freed_human"] = human_bytes(int(results["estimated_freed_bytes"]))
         return results
 
@@ -1544,6 +1767,7 @@ class CleanupEngine:
         failed = 0
         failures = []
 
+        self.store.begin()
         for r in rows:
             if r["restored_at"]:
                 continue
@@ -1563,7 +1787,7 @@ class CleanupEngine:
                 failed += 1
                 failures.append({"original": str(orig), "quarantine": str(qpath), "error": str(exc)})
 
-        self.store.conn.commit()
+        self.store.commit()
         return {
             "action_id": action_id,
             "restored": restored,